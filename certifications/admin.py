@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Issuer, Student, QRCodeCustomization, CertificateTemplate, CSVUpload, SampleCSV
+from .search import search_students
 
 @admin.register(Issuer)
 class IssuerAdmin(admin.ModelAdmin):
@@ -13,10 +14,14 @@ class StudentAdmin(admin.ModelAdmin):
     search_fields = ('noms_et_prenoms', 'matricule', 'numero', 'filiere')
     readonly_fields = ('issue_date',)
 
+    def get_search_results(self, request, queryset, search_term):
+        # Indexed prefix search instead of icontains scans over every column.
+        return search_students(queryset, search_term), False
+
 @admin.register(QRCodeCustomization)
 class QRCodeCustomizationAdmin(admin.ModelAdmin):
-    list_display = ('id', 'foreground_color', 'background_color')
-    list_filter = ('foreground_color', 'background_color')
+    list_display = ('id', 'foreground_color', 'background_color', 'output_format')
+    list_filter = ('foreground_color', 'background_color', 'output_format')
 
 @admin.register(CertificateTemplate)
 class CertificateTemplateAdmin(admin.ModelAdmin):
@@ -26,8 +31,9 @@ class CertificateTemplateAdmin(admin.ModelAdmin):
 
 @admin.register(CSVUpload)
 class CSVUploadAdmin(admin.ModelAdmin):
-    list_display = ('id', 'file', 'uploaded_at')
-    readonly_fields = ('uploaded_at',)
+    list_display = ('id', 'file', 'uploaded_at', 'mode', 'status', 'total_records', 'successful_records', 'updated_records', 'skipped_records', 'failed_records')
+    list_filter = ('status', 'mode')
+    readonly_fields = ('uploaded_at', 'started_at', 'finished_at')
 
 @admin.register(SampleCSV)
 class SampleCSVAdmin(admin.ModelAdmin):
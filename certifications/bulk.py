@@ -0,0 +1,77 @@
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from certifications.models import Student
+from certifications.pdf import delete_certificate_pdfs
+from certifications.qr import QR_CODE_DIR, qr_link_path
+from certifications.verification import invalidate_issuer_counts, invalidate_student_pages
+
+
+def sweep_qr_files(paths):
+    """
+    Delete the QR images at ``paths``, listing the directory once.
+
+    One ``listdir`` replaces an ``exists()`` call per file, and only files
+    actually present are deleted. Links are unique per student, so the images
+    of deleted students are not shared with anyone else.
+    """
+    paths = set(paths)
+    if not paths:
+        return 0
+    try:
+        _, files = default_storage.listdir(QR_CODE_DIR)
+    except FileNotFoundError:
+        return 0
+    present = paths.intersection(f'{QR_CODE_DIR}/{name}' for name in files)
+    for path in present:
+        default_storage.delete(path)
+    return len(present)
+
+
+def sweep_student_files(student_ids, qr_paths):
+    """Delete the QR images and certificate PDFs left by deleted students."""
+    sweep_qr_files(path for path in qr_paths if path)
+    delete_certificate_pdfs(student_ids)
+
+
+def bulk_delete_students(students):
+    """
+    Delete every student of the ``students`` queryset.
+
+    The rows are snapshotted first and exactly those ids are deleted, so the
+    files swept afterwards belong to the rows that are gone even if the
+    queryset would now match others. The post_delete signals keep the search
+    index and caches up to date; the QR images and stored certificates are
+    swept once the deletion is committed. Returns the number of students deleted.
+    """
+    with transaction.atomic():
+        rows = list(students.order_by().values_list('id', 'qr_code_link'))
+        if not rows:
+            return 0
+        student_ids = [student_id for student_id, _ in rows]
+        _, deleted = Student.objects.filter(id__in=student_ids).delete()
+        paths = [qr_link_path(link) for _, link in rows]
+        transaction.on_commit(lambda: sweep_student_files(student_ids, paths))
+    return deleted.get(Student._meta.label, 0)
+
+
+def bulk_update_students(students, **values):
+    """
+    Set ``values`` on every student of the ``students`` queryset in one UPDATE.
+
+    Only issuer, template and session are changed this way: none of them is
+    in the search index or the QR payload, so only the cached pages and the
+    issuer counts need refreshing. Returns the number of students updated.
+    """
+    with transaction.atomic():
+        rows = list(students.order_by().values_list('id', 'issuer_id'))
+        if not rows:
+            return 0
+        updated = students.update(**values, updated_at=timezone.now())
+    invalidate_student_pages([student_id for student_id, _ in rows])
+    issuer_ids = {issuer_id for _, issuer_id in rows}
+    if 'issuer' in values:
+        issuer_ids.add(values['issuer'].id)
+    invalidate_issuer_counts(issuer_ids)
+    return updated
@@ -0,0 +1,254 @@
+import csv
+import hashlib
+import io
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse
+from django.urls import Resolver404, resolve
+
+from certifications.importers import iter_batches
+from certifications.qr import (
+    QR_CODE_DIR, QR_FORMATS, get_qr_customization, get_qr_image, qr_link_path, qr_payload, qr_style_key,
+)
+
+# Rows fetched per round trip while iterating students.
+EXPORT_CHUNK_SIZE = 2000
+# Bytes accumulated before a chunk is handed to the response.
+EXPORT_FLUSH_SIZE = 64 * 1024
+# Threads reading QR images from storage, and images read per window. The
+# window bounds how many PNGs are held in memory at once.
+EXPORT_READ_WORKERS = 8
+EXPORT_READ_WINDOW = 256
+
+# Built archives are kept in media storage under their content digest.
+EXPORT_CACHE_DIR = 'exports'
+EXPORT_CACHE_MAX_FILES = 20
+
+EXPORT_CSV_HEADER = [
+    'Noms et Prénoms', 'Matricule', 'Filière', 'Mention', 'Session', 'Sexe', 'Date de Naissance',
+    'Lieu de Naissance', 'Numéro', 'Issuer', 'Issue Date', 'QR Code Link',
+]
+
+
+class ZipStream(io.RawIOBase):
+    """
+    Write-only, unseekable sink for ``zipfile.ZipFile``.
+
+    ZipFile falls back to data descriptors when it cannot seek, so entries are
+    written strictly front to back and can be sent as soon as they are produced.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+        self.offset = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+def stored_qr_paths():
+    """Return the set of paths under ``qr_codes/`` with a single directory listing."""
+    try:
+        _, files = default_storage.listdir(QR_CODE_DIR)
+    except FileNotFoundError:
+        return set()
+    return {f'{QR_CODE_DIR}/{name}' for name in files}
+
+
+def read_storage_file(path):
+    with default_storage.open(path, 'rb') as f:
+        return f.read()
+
+
+def qr_endpoint_format(link):
+    """Format of an on-demand link to the student's own QR endpoint, or None for any other link."""
+    try:
+        match = resolve(urlparse(link).path)
+    except Resolver404:
+        return None
+    if match.url_name != 'student_qr_image' or match.kwargs['fmt'] not in QR_FORMATS:
+        return None
+    return match.kwargs['fmt']
+
+
+def export_qr_entries(links, present):
+    """
+    Yield ``(archive name, load)`` for every exportable QR image.
+
+    Stored images are read from storage when the listing has them. Links to
+    the QR endpoint (QR_ON_DEMAND) have no stored file of their own, so their
+    image comes from get_qr_image(), which renders it on a cache miss.
+    """
+    style_key = None
+    for student_id, link in links:
+        path = qr_link_path(link)
+        if path is not None:
+            if path in present:
+                yield f'qr_codes/student_{student_id}{os.path.splitext(path)[1]}', partial(read_storage_file, path)
+            continue
+        fmt = qr_endpoint_format(link)
+        if fmt is None:
+            continue
+        if style_key is None:
+            style_key = qr_style_key(get_qr_customization())
+        yield f'qr_codes/student_{student_id}.{fmt}', partial(get_qr_image, qr_payload(student_id), style_key, fmt, None)
+
+
+def student_csv_row(student):
+    return [
+        student.noms_et_prenoms,
+        student.matricule,
+        student.filiere,
+        student.mention,
+        student.session,
+        student.sexe,
+        student.date_de_naissance,
+        student.lieu_de_naissance,
+        student.numero,
+        student.issuer.name_en,
+        student.issue_date,
+        student.qr_code_link,
+    ]
+
+
+def stream_qr_export(students):
+    """
+    Yield a ZIP of ``student_data.csv`` plus every student's QR code image.
+
+    ``students`` is a Student queryset. It is iterated twice with
+    ``.iterator()`` (CSV rows, then images), so memory use does not grow with
+    the number of students. Image existence comes from one listing of
+    ``qr_codes/`` and the images are read by a small thread pool.
+    """
+    stream = ZipStream()
+    with zipfile.ZipFile(stream, 'w') as zip_file:
+        with zip_file.open('student_data.csv', 'w') as csv_entry:
+            csv_text = io.TextIOWrapper(csv_entry, encoding='utf-8', newline='')
+            csv_writer = csv.writer(csv_text)
+            csv_writer.writerow(EXPORT_CSV_HEADER)
+            for student in students.select_related('issuer').iterator(chunk_size=EXPORT_CHUNK_SIZE):
+                csv_writer.writerow(student_csv_row(student))
+                if stream.size >= EXPORT_FLUSH_SIZE:
+                    yield stream.pop()
+            csv_text.flush()
+            csv_text.detach()
+
+        present = stored_qr_paths()
+        qr_students = students.exclude(qr_code_link__isnull=True).exclude(qr_code_link='')
+        links = qr_students.values_list('id', 'qr_code_link').iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        # Images are stored under content hashes; the archive names them by student.
+        entries = export_qr_entries(links, present)
+        with ThreadPoolExecutor(max_workers=EXPORT_READ_WORKERS) as pool:
+            for window in iter_batches(entries, EXPORT_READ_WINDOW):
+                images = pool.map(lambda load: load(), [load for _, load in window])
+                for (name, _), image in zip(window, images):
+                    # PNGs are already compressed; SVG text deflates well.
+                    compression = zipfile.ZIP_DEFLATED if name.endswith('.svg') else zipfile.ZIP_STORED
+                    zip_file.writestr(name, image, compression)
+                    if stream.size >= EXPORT_FLUSH_SIZE:
+                        yield stream.pop()
+    yield stream.pop()
+
+
+def export_digest(students):
+    """
+    Content address of the export of ``students``.
+
+    Hashes every exported column plus the QR styling, so any change to the
+    selected rows or to how their images look yields a new digest. This is a
+    single query and no image reads, far cheaper than building the archive.
+    """
+    qr_customization = get_qr_customization()
+    digest = hashlib.sha256()
+    digest.update(repr((
+        settings.BASE_URL,
+        qr_customization.id,
+        qr_customization.foreground_color,
+        qr_customization.background_color,
+        qr_customization.logo.name,
+        qr_customization.output_format,
+    )).encode())
+    rows = students.values_list(
+        'id', 'noms_et_prenoms', 'matricule', 'filiere', 'mention', 'session', 'sexe', 'date_de_naissance',
+        'lieu_de_naissance', 'numero', 'issuer__name_en', 'issue_date', 'qr_code_link',
+    )
+    for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        digest.update(repr(row).encode())
+    return digest.hexdigest()
+
+
+def export_cache_path(digest):
+    return f'{EXPORT_CACHE_DIR}/{digest}.zip'
+
+
+def cache_export(chunks, path):
+    """
+    Pass ``chunks`` through while copying them to a temporary file.
+
+    The file is moved into storage at ``path`` only once the archive is
+    complete, so an interrupted download never leaves a truncated bundle.
+    """
+    with tempfile.TemporaryFile() as tmp:
+        for chunk in chunks:
+            tmp.write(chunk)
+            yield chunk
+        tmp.seek(0)
+        if not default_storage.exists(path):
+            default_storage.save(path, File(tmp))
+    prune_export_cache()
+
+
+def prune_export_cache():
+    """Delete the oldest cached archives beyond EXPORT_CACHE_MAX_FILES."""
+    try:
+        _, files = default_storage.listdir(EXPORT_CACHE_DIR)
+    except FileNotFoundError:
+        return
+    paths = [f'{EXPORT_CACHE_DIR}/{name}' for name in files]
+    paths.sort(key=default_storage.get_modified_time, reverse=True)
+    for path in paths[EXPORT_CACHE_MAX_FILES:]:
+        default_storage.delete(path)
+
+
+def cached_export_response(path, filename):
+    """
+    Serve a cached archive from storage.
+
+    With ``settings.EXPORT_SENDFILE_HEADER`` set, the web server sends the
+    file: ``X-Accel-Redirect`` (nginx) gets the media URL, any other header
+    (e.g. Apache's ``X-Sendfile``) gets the filesystem path.
+    """
+    header = settings.EXPORT_SENDFILE_HEADER
+    if header:
+        response = HttpResponse(content_type='application/zip')
+        if header.lower() == 'x-accel-redirect':
+            response[header] = default_storage.url(path)
+        else:
+            response[header] = default_storage.path(path)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    return FileResponse(default_storage.open(path, 'rb'), as_attachment=True, filename=filename)
@@ -1,6 +1,9 @@
 from django import forms
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from .models import CertificateTemplate, Student, Issuer
+from .models import CertificateTemplate, CSVUpload, Student, Issuer
+from .readers import import_reader
+from .search import search_students
 
 class CertificateTemplateForm(forms.ModelForm):
     class Meta:
@@ -73,18 +76,29 @@ class StudentForm(forms.ModelForm):
 
 class CSVUploadForm(forms.Form):
     csv_file = forms.FileField(
-        label='Select a CSV file',
-        help_text='Max. 5 megabytes',
+        label='Select a CSV or Excel file',
+        help_text=f'Max. {settings.IMPORT_MAX_UPLOAD_SIZE // (1024 * 1024)} megabytes',
         widget=forms.ClearableFileInput(attrs={'class': 'form-control-file'})
     )
+    mode = forms.ChoiceField(
+        choices=CSVUpload.MODE_CHOICES,
+        required=False,
+        widget=forms.RadioSelect,
+    )
+
+    def clean_mode(self):
+        return self.cleaned_data['mode'] or 'insert'
 
     def clean_csv_file(self):
         csv_file = self.cleaned_data['csv_file']
         if csv_file:
-            if csv_file.size > 5 * 1024 * 1024:  # 5 MB limit
-                raise forms.ValidationError("File size must be under 5 MB.")
-            if not csv_file.name.endswith('.csv'):
-                raise forms.ValidationError("File must be a CSV.")
+            # Imports stream from disk, so the limit only bounds storage use.
+            if csv_file.size > settings.IMPORT_MAX_UPLOAD_SIZE:
+                raise forms.ValidationError(
+                    f"File size must be under {settings.IMPORT_MAX_UPLOAD_SIZE // (1024 * 1024)} MB."
+                )
+            if import_reader(csv_file.name) is None:
+                raise forms.ValidationError("File must be a CSV or an Excel (.xlsx) file.")
         return csv_file
 
 class IssuerForm(forms.ModelForm):
@@ -95,3 +109,75 @@ class IssuerForm(forms.ModelForm):
             'name_en': forms.TextInput(attrs={'class': 'form-control'}),
             'signature': forms.ClearableFileInput(attrs={'class': 'form-control-file'}),
         }
+
+class StudentFilterForm(forms.Form):
+    q = forms.CharField(required=False, label='Search')
+    issuer = forms.ModelChoiceField(queryset=Issuer.objects.all(), required=False)
+    session = forms.CharField(required=False)
+    filiere = forms.CharField(required=False)
+    mention = forms.CharField(required=False)
+    since = forms.DateTimeField(required=False, help_text='Only students issued at or after this date')
+
+    def filter(self, students):
+        """Apply the cleaned filters to a Student queryset."""
+        data = self.cleaned_data
+        if data.get('issuer'):
+            students = students.filter(issuer=data['issuer'])
+        for field in ('session', 'filiere', 'mention'):
+            if data.get(field):
+                students = students.filter(**{field: data[field]})
+        if data.get('since'):
+            students = students.filter(issue_date__gte=data['since'])
+        return search_students(students, data.get('q'))
+
+class BulkStudentActionForm(StudentFilterForm):
+    ACTION_CHOICES = [
+        ('delete', 'Delete'),
+        ('issuer', 'Change issuer'),
+        ('template', 'Change template'),
+        ('session', 'Change session'),
+    ]
+    FILTER_FIELDS = ['q', 'issuer', 'session', 'filiere', 'mention', 'since']
+
+    action = forms.ChoiceField(choices=ACTION_CHOICES)
+    new_issuer = forms.ModelChoiceField(queryset=Issuer.objects.all(), required=False)
+    new_template = forms.ModelChoiceField(queryset=CertificateTemplate.objects.all(), required=False)
+    new_session = forms.CharField(required=False, max_length=Student._meta.get_field('session').max_length)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not any(cleaned_data.get(field) for field in self.FILTER_FIELDS):
+            raise ValidationError("Filter the students first; bulk actions never apply to every student.")
+        action = cleaned_data.get('action')
+        if action in ('issuer', 'session') and not cleaned_data.get(f'new_{action}'):
+            self.add_error(f'new_{action}', f"Choose the new {action}.")
+        return cleaned_data
+
+    def values(self):
+        """Field values the chosen update action sets (None for delete)."""
+        action = self.cleaned_data['action']
+        if action == 'delete':
+            return None
+        # An empty template resets the students to the default one.
+        return {action: self.cleaned_data[f'new_{action}']}
+
+class ExportFilterForm(StudentFilterForm):
+    id_min = forms.IntegerField(required=False, min_value=1)
+    id_max = forms.IntegerField(required=False, min_value=1)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        id_min = cleaned_data.get('id_min')
+        id_max = cleaned_data.get('id_max')
+        if id_min and id_max and id_min > id_max:
+            raise ValidationError("id_min must not be greater than id_max.")
+        return cleaned_data
+
+    def filter(self, students):
+        students = super().filter(students)
+        data = self.cleaned_data
+        if data.get('id_min'):
+            students = students.filter(id__gte=data['id_min'])
+        if data.get('id_max'):
+            students = students.filter(id__lte=data['id_max'])
+        return students
@@ -0,0 +1,375 @@
+import io
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from certifications.models import Student, Issuer
+from certifications.qr import default_worker_count, generate_qr_codes
+from certifications.search import index_students
+from certifications.verification import invalidate_issuer_counts, invalidate_student_pages
+
+# Number of CSV rows resolved and written per bulk_create/bulk_update round trip.
+IMPORT_BATCH_SIZE = 1000
+# Student fields an upsert import compares and overwrites, with the file column
+# each is read from; matricule is the key. Columns missing from the file are
+# left as they are.
+UPSERT_FIELDS = {
+    'noms_et_prenoms': 'noms_et_prenoms',
+    'filiere': 'filiere',
+    'mention': 'mention',
+    'session': 'session',
+    'sexe': 'sexe',
+    'date_de_naissance': 'date_de_naissance',
+    'lieu_de_naissance': 'lieu_de_naissance',
+    'numero': 'numero',
+    'issuer': 'issuer_name_en',
+}
+UPSERT_ATTNAMES = {name: Student._meta.get_field(name).attname for name in UPSERT_FIELDS}
+# Columns CopyStudentImporter streams into its staging table. Ids are taken
+# from the sequence up front so inserted rows map back to their students.
+COPY_FIELDS = [
+    'id', 'noms_et_prenoms', 'matricule', 'filiere', 'mention', 'session', 'sexe', 'date_de_naissance',
+    'lieu_de_naissance', 'numero', 'issuer',
+]
+COPY_COLUMNS = [Student._meta.get_field(name).column for name in COPY_FIELDS]
+COPY_STAGING_TABLE = 'certifications_student_staging'
+
+
+@dataclass
+class ImportResult:
+    success_count: int = 0
+    # Existing matricules: rewritten (upsert mode) or left as they are.
+    update_count: int = 0
+    skip_count: int = 0
+    error_count: int = 0
+    error_messages: list = field(default_factory=list)
+
+    @property
+    def row_count(self):
+        return self.success_count + self.update_count + self.skip_count + self.error_count
+
+
+def iter_batches(rows, batch_size):
+    """Yield lists of at most ``batch_size`` items from ``rows``."""
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+class StudentImporter:
+    """
+    Set-based importer for student rows (dicts keyed by CSV column name).
+
+    Rows are processed in batches: existing matricules/numeros and issuers are
+    fetched with one ``IN`` query per batch, missing issuers are created once per
+    distinct ``issuer_name_en`` and students are written with ``bulk_create``.
+
+    Rows whose matricule already exists are skipped, unless ``update_existing``
+    is set: then they are diffed against the stored student and only the rows
+    that differ are written back, with ``bulk_update``.
+    """
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE, generate_qr=True, on_batch=None, qr_workers=None,
+                 update_existing=False):
+        self.batch_size = batch_size
+        self.update_existing = update_existing
+        self.generate_qr = generate_qr
+        self.qr_workers = qr_workers or default_worker_count()
+        self.qr_executor = None
+        # Called with the running ImportResult after every committed batch.
+        self.on_batch = on_batch
+        self.result = ImportResult()
+        self.issuers = {}
+        # Keys claimed by earlier rows of the same file. Blank keys are stored
+        # as NULL, which never conflicts, so they are not tracked.
+        self.seen_matricules = set()
+        self.seen_numeros = set()
+
+    def run(self, rows):
+        use_pool = self.generate_qr and self.qr_workers > 1 and not settings.QR_ON_DEMAND
+        # One render pool for the whole file rather than one per batch.
+        with ProcessPoolExecutor(max_workers=self.qr_workers) if use_pool else nullcontext() as executor:
+            self.qr_executor = executor
+            for batch in iter_batches(rows, self.batch_size):
+                self.import_batch(batch)
+                if self.on_batch:
+                    self.on_batch(self.result)
+        self.qr_executor = None
+        return self.result
+
+    def import_batch(self, rows):
+        first_row = self.result.row_count + 1
+        matricules = {row.get('matricule') or None for row in rows}
+        numeros = {row.get('numero') or None for row in rows}
+        columns = ['id', 'matricule'] + (list(UPSERT_FIELDS) + ['qr_code_link'] if self.update_existing else [])
+        existing = {
+            student.matricule: student
+            for student in Student.objects.filter(matricule__in=matricules).only(*columns)
+        }
+        # numero -> id of the student holding it.
+        numero_owners = dict(Student.objects.filter(numero__in=numeros).values_list('numero', 'id'))
+
+        with transaction.atomic():
+            self.resolve_issuers({
+                row.get('issuer_name_en') for row in rows
+                if self.update_existing or row.get('matricule') not in existing
+            })
+
+            students = []
+            updated = []
+            updated_fields = set()
+            old_issuer_ids = set()
+            for row_number, row in enumerate(rows, start=first_row):
+                matricule = row.get('matricule') or None
+                if matricule in self.seen_matricules or (matricule in existing and not self.update_existing):
+                    self.result.skip_count += 1
+                    continue
+                current = existing.get(matricule)
+                try:
+                    student = self.build_student(row)
+                    self.check_numero(student, current, numero_owners)
+                except (KeyError, ValidationError) as e:
+                    self.add_error(row_number, e)
+                    continue
+                self.claim_keys(student)
+                if current is None:
+                    students.append(student)
+                    continue
+                # Blank form fields are stored as NULL, CSV cells as ''.
+                changed = [
+                    name for name, attname in UPSERT_ATTNAMES.items()
+                    if UPSERT_FIELDS[name] in row
+                    and (getattr(current, attname) or None) != (getattr(student, attname) or None)
+                ]
+                if not changed:
+                    self.result.skip_count += 1
+                    continue
+                old_issuer_ids.add(current.issuer_id)
+                for name in changed:
+                    setattr(current, UPSERT_ATTNAMES[name], getattr(student, UPSERT_ATTNAMES[name]))
+                updated.append(current)
+                updated_fields.update(changed)
+
+            if not students and not updated:
+                return
+            if updated:
+                self.update_students(updated, [name for name in UPSERT_FIELDS if name in updated_fields])
+            if students:
+                Student.objects.bulk_create(students, batch_size=self.batch_size)
+                index_students(students)
+                if self.generate_qr:
+                    self.attach_qr_codes(students)
+
+        self.result.success_count += len(students)
+        self.result.update_count += len(updated)
+        # bulk_create and bulk_update send no post_save, so the search index is
+        # fed above and the cached pages and counts are dropped here.
+        invalidate_student_pages([student.id for student in updated])
+        invalidate_issuer_counts(old_issuer_ids | {student.issuer_id for student in students + updated})
+
+    def check_numero(self, student, current, numero_owners):
+        """Raise if ``student`` takes a numero held by another student or an earlier row."""
+        if student.numero is None:
+            return
+        student_id = current.id if current else None
+        if student.numero in self.seen_numeros or numero_owners.get(student.numero, student_id) != student_id:
+            raise ValidationError(f"Un étudiant avec le numéro {student.numero} existe déjà.")
+
+    def claim_keys(self, student):
+        if student.matricule is not None:
+            self.seen_matricules.add(student.matricule)
+        if student.numero is not None:
+            self.seen_numeros.add(student.numero)
+
+    def update_students(self, students, fields):
+        """Write ``fields`` of changed existing ``students`` (diffed in import_batch) back."""
+        now = timezone.now()
+        for student in students:
+            student.updated_at = now
+        Student.objects.bulk_update(students, fields + ['updated_at'], batch_size=self.batch_size)
+        index_students(students)
+        # The QR payload is the verification URL, which only depends on the
+        # id, so edited rows keep their image; only rows without one get it.
+        if self.generate_qr:
+            self.attach_qr_codes([student for student in students if not student.qr_code_link])
+
+    def attach_qr_codes(self, students):
+        if not students:
+            return
+        qr_code_links = generate_qr_codes(
+            [student.id for student in students],
+            executor=self.qr_executor,
+            max_workers=self.qr_workers,
+        )
+        now = timezone.now()
+        for student in students:
+            student.qr_code_link = qr_code_links[student.id]
+            student.updated_at = now
+        Student.objects.bulk_update(students, ['qr_code_link', 'updated_at'], batch_size=self.batch_size)
+
+    def resolve_issuers(self, names):
+        """Fill ``self.issuers`` for every name, creating the missing issuers."""
+        missing = {name for name in names if name is not None and name not in self.issuers}
+        if not missing:
+            return
+        for issuer in Issuer.objects.filter(name_en__in=missing).order_by('-id'):
+            # Descending order so the oldest issuer wins when names are duplicated.
+            self.issuers[issuer.name_en] = issuer
+        for name in missing - self.issuers.keys():
+            self.issuers[name] = Issuer.objects.create(name_en=name)
+
+    def build_student(self, row):
+        values = {
+            'noms_et_prenoms': row['noms_et_prenoms'],
+            # Blank keys are stored as NULL: the columns are unique and nullable.
+            'matricule': row['matricule'] or None,
+            'filiere': row['filiere'],
+            'mention': row['mention'],
+            'session': row.get('session', ''),
+            'sexe': row.get('sexe', ''),
+            'date_de_naissance': row.get('date_de_naissance') or None,
+            'lieu_de_naissance': row.get('lieu_de_naissance', ''),
+            'numero': row.get('numero') or None,
+        }
+        for name, value in values.items():
+            model_field = Student._meta.get_field(name)
+            values[name] = model_field.to_python(value)
+            model_field.run_validators(values[name])
+        return Student(issuer=self.issuers[row['issuer_name_en']], **values)
+
+    def add_error(self, row_number, error):
+        self.result.error_count += 1
+        if isinstance(error, KeyError):
+            message = f"Missing column {error}"
+        elif isinstance(error, ValidationError):
+            message = '; '.join(error.messages)
+        else:
+            message = str(error)
+        self.result.error_messages.append(f"Error in row {row_number}: {message}")
+
+
+def copy_text(value):
+    """Encode one value for PostgreSQL's text COPY format."""
+    if value is None:
+        return r'\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+class CopyStudentImporter(StudentImporter):
+    """
+    StudentImporter for PostgreSQL that writes each batch without ORM inserts.
+
+    Validated rows are streamed into a temporary staging table with
+    ``COPY FROM STDIN`` and moved into the student table by a single
+    ``INSERT ... SELECT ... ON CONFLICT DO NOTHING``. Any row that conflicts
+    (including with a concurrent import) is left out by the database instead
+    of aborting the batch, then classified as skipped or failed.
+    """
+
+    def import_batch(self, rows):
+        first_row = self.result.row_count + 1
+        matricules = {row.get('matricule') or None for row in rows}
+        existing_matricules = set(
+            Student.objects.filter(matricule__in=matricules).values_list('matricule', flat=True)
+        )
+
+        with transaction.atomic():
+            self.resolve_issuers({
+                row.get('issuer_name_en') for row in rows
+                if row.get('matricule') not in existing_matricules
+            })
+
+            staged = []
+            for row_number, row in enumerate(rows, start=first_row):
+                matricule = row.get('matricule') or None
+                if matricule in existing_matricules or matricule in self.seen_matricules:
+                    self.result.skip_count += 1
+                    continue
+                try:
+                    student = self.build_student(row)
+                    if student.numero is not None and student.numero in self.seen_numeros:
+                        raise ValidationError(f"Un étudiant avec le numéro {student.numero} existe déjà.")
+                except (KeyError, ValidationError) as e:
+                    self.add_error(row_number, e)
+                    continue
+                self.claim_keys(student)
+                staged.append((row_number, student))
+
+            if not staged:
+                return
+            inserted = self.copy_students([student for _, student in staged])
+
+            students = []
+            rejected = [student.matricule for _, student in staged if student.id not in inserted]
+            # Matricules that exist now were added by someone else meanwhile;
+            # the other rejected rows clashed on their numero.
+            taken = set(Student.objects.filter(matricule__in=rejected).values_list('matricule', flat=True))
+            for row_number, student in staged:
+                if student.id in inserted:
+                    students.append(student)
+                elif student.matricule in taken:
+                    self.result.skip_count += 1
+                else:
+                    self.add_error(row_number, ValidationError(
+                        f"Un étudiant avec le numéro {student.numero} existe déjà."
+                    ))
+
+            index_students(students)
+            if self.generate_qr:
+                self.attach_qr_codes(students)
+
+        self.result.success_count += len(students)
+        invalidate_issuer_counts({student.issuer_id for student in students})
+
+    def copy_students(self, students):
+        """COPY ``students`` into the staging table, insert them and return the ids inserted."""
+        table = Student._meta.db_table
+        columns = ', '.join(COPY_COLUMNS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+                [table, Student._meta.pk.column, len(students)],
+            )
+            for student, (student_id,) in zip(students, cursor.fetchall()):
+                student.id = student_id
+            buffer = io.StringIO()
+            for student in students:
+                buffer.write('\t'.join(copy_text(getattr(student, Student._meta.get_field(name).attname))
+                                       for name in COPY_FIELDS))
+                buffer.write('\n')
+            buffer.seek(0)
+            # Temporary tables live per connection, so with persistent
+            # connections the table is created once and emptied per batch.
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE IF NOT EXISTS {COPY_STAGING_TABLE} AS '
+                f'SELECT {columns} FROM {table} WITH NO DATA'
+            )
+            cursor.execute(f'TRUNCATE {COPY_STAGING_TABLE}')
+            cursor.copy_expert(f'COPY {COPY_STAGING_TABLE} ({columns}) FROM STDIN', buffer)
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}, issue_date, updated_at) '
+                f'SELECT {columns}, %s, %s FROM {COPY_STAGING_TABLE} '
+                f'ON CONFLICT DO NOTHING RETURNING id',
+                [timezone.now()] * 2,
+            )
+            return {student_id for student_id, in cursor.fetchall()}
+
+
+def student_importer(update_existing=False, **kwargs):
+    """
+    The importer for the current database: COPY-based on PostgreSQL for
+    plain inserts, the ORM one otherwise (and for upserts, which diff rows in
+    Python).
+    """
+    if connection.vendor == 'postgresql' and not update_existing:
+        return CopyStudentImporter(**kwargs)
+    return StudentImporter(update_existing=update_existing, **kwargs)
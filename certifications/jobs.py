@@ -0,0 +1,111 @@
+import logging
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.db.models import Q
+from django.utils import timezone
+
+from certifications.importers import student_importer
+from certifications.models import CSVUpload
+from certifications.readers import import_rows, local_csv_path
+from certifications.validation import error_report_csv, validate_import_file
+
+logger = logging.getLogger(__name__)
+
+# Validation errors copied into error_log; the full list is in error_report.
+ERROR_LOG_LIMIT = 50
+# A processing upload without progress for this long is reclaimed. Progress
+# is saved after every batch, which takes seconds.
+UPLOAD_STALE_AFTER = timedelta(minutes=15)
+
+
+def claim_next_upload(stale_after=UPLOAD_STALE_AFTER):
+    """
+    Atomically move the oldest claimable CSVUpload to ``processing`` and return it.
+
+    Claimable means pending, or processing without progress for ``stale_after``
+    (its worker was killed mid-import). A reclaimed upload starts over; rows
+    it already imported are found and skipped as existing. The conditional
+    UPDATE means several workers can poll the same table without ever
+    processing one upload twice. Returns None when the queue is empty.
+    """
+    while True:
+        now = timezone.now()
+        upload = CSVUpload.objects.filter(
+            Q(status='pending') | Q(status='processing', updated_at__lt=now - stale_after)
+        ).order_by('uploaded_at', 'id').first()
+        if upload is None:
+            return None
+        claimed = CSVUpload.objects.filter(pk=upload.pk, status=upload.status, updated_at=upload.updated_at).update(
+            status='processing', started_at=now, updated_at=now,
+            successful_records=0, updated_records=0, skipped_records=0, failed_records=0,
+        )
+        if claimed:
+            upload.refresh_from_db()
+            return upload
+
+
+def process_upload(upload):
+    """Import a claimed CSVUpload, writing progress back after every batch."""
+
+    def save_progress(result):
+        CSVUpload.objects.filter(pk=upload.pk).update(
+            successful_records=result.success_count,
+            updated_records=result.update_count,
+            skipped_records=result.skip_count,
+            failed_records=result.error_count,
+            updated_at=timezone.now(),
+        )
+
+    try:
+        # An .xlsx is converted to CSV once, up front. Two streaming passes
+        # over that CSV follow: a column-wise validation that also counts the
+        # rows for the progress bar, then the import itself, which reads and
+        # writes one batch at a time. Files with errors never reach the database.
+        with local_csv_path(upload.file) as path:
+            with open(path, 'rb') as f:
+                upload.total_records, errors = validate_import_file(f)
+            if not errors.empty:
+                return reject_upload(upload, errors)
+            upload.save(update_fields=['total_records', 'updated_at'])
+
+            importer = student_importer(on_batch=save_progress, update_existing=upload.mode == 'upsert')
+            result = importer.run(import_rows(path))
+    except Exception as e:
+        logger.exception('CSV upload %s failed', upload.pk)
+        upload.status = 'failed'
+        upload.error_log = f'Error processing CSV file: {e}'
+        upload.finished_at = timezone.now()
+        upload.save(update_fields=['status', 'error_log', 'finished_at'])
+        return upload
+
+    upload.successful_records = result.success_count
+    upload.updated_records = result.update_count
+    upload.skipped_records = result.skip_count
+    upload.failed_records = result.error_count
+    upload.error_log = '\n'.join(result.error_messages)
+    upload.processed = True
+    upload.status = 'done'
+    upload.finished_at = timezone.now()
+    upload.save()
+    return upload
+
+
+def reject_upload(upload, errors):
+    """Fail ``upload`` with a downloadable report of its validation errors."""
+    upload.error_report.save(f'upload_{upload.pk}_errors.csv', ContentFile(error_report_csv(errors)), save=False)
+    lines = [
+        f"Error in row {error.row}: {error.column}: {error.error}" if error.row != ''
+        else f"{error.column}: {error.error}"
+        for error in errors.head(ERROR_LOG_LIMIT).itertuples()
+    ]
+    upload.error_log = '\n'.join([f'File rejected: {len(errors)} validation errors.'] + lines)
+    if len(errors) > ERROR_LOG_LIMIT:
+        upload.error_log += f'\n... {len(errors) - ERROR_LOG_LIMIT} more in the error report.'
+    upload.failed_records = errors['row'][errors['row'] != ''].nunique()
+    upload.status = 'failed'
+    upload.finished_at = timezone.now()
+    upload.save(update_fields=[
+        'total_records', 'failed_records', 'error_log', 'error_report', 'status', 'finished_at',
+    ])
+    return upload
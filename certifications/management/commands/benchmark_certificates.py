@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from certifications.models import Student
+from certifications.pdf import CERTIFICATE_CHUNK_SIZE, render_certificate_batches
+from certifications.qr import default_worker_count
+
+
+class Command(BaseCommand):
+    help = 'Measure certificate PDF rendering throughput (pages/sec) for several process pool sizes. Nothing is stored.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=500, help='Certificates to render (from the first students).')
+        parser.add_argument(
+            '--workers', type=int, nargs='+',
+            help='Pool sizes to measure (default: 1, 2, 4, ... up to the core count).',
+        )
+        parser.add_argument('--chunk-size', type=int, default=CERTIFICATE_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        worker_counts = options['workers']
+        if not worker_counts:
+            worker_counts = [1]
+            while worker_counts[-1] * 2 <= default_worker_count():
+                worker_counts.append(worker_counts[-1] * 2)
+            if worker_counts[-1] != default_worker_count():
+                worker_counts.append(default_worker_count())
+
+        ids = list(Student.objects.order_by('id').values_list('id', flat=True)[:options['pages']])
+        if not ids:
+            raise CommandError('No students to render.')
+        students = Student.objects.filter(id__in=ids)
+
+        baseline = None
+        for workers in worker_counts:
+            start = time.perf_counter()
+            size = sum(
+                len(pdf) for _, pdf in
+                render_certificate_batches(students, max_workers=workers, chunk_size=options['chunk_size'])
+            )
+            elapsed = time.perf_counter() - start
+            rate = len(ids) / elapsed
+            baseline = baseline or rate
+            self.stdout.write(
+                f'{workers:>3} workers: {len(ids)} pages ({size // 1024} KiB) in {elapsed:.2f}s '
+                f'({rate:.1f} pages/s, {rate / baseline:.2f}x)'
+            )
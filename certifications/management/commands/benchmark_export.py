@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from certifications.exports import stream_qr_export
+from certifications.models import Student
+
+
+class Command(BaseCommand):
+    help = 'Build the QR code export for all students and report its size and build time.'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        size = sum(len(chunk) for chunk in stream_qr_export(Student.objects.order_by('id')))
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'{size} bytes in {elapsed:.2f}s')
@@ -0,0 +1,121 @@
+import csv
+import os
+import tempfile
+import time
+from contextlib import nullcontext
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test.utils import CaptureQueriesContext
+from openpyxl import Workbook
+
+from certifications.importers import IMPORT_BATCH_SIZE, student_importer
+from certifications.models import Student
+from certifications.qr import qr_link_path
+from certifications.readers import import_rows, local_csv_path
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure StudentImporter row throughput on synthetic rows. Database writes are rolled back and '
+        'QR images stored by --with-qr are deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000)
+        parser.add_argument('--issuers', type=int, default=5, help='Number of distinct issuer names.')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument('--with-qr', action='store_true', help='Also render and store QR images; they are deleted after the run.')
+        parser.add_argument(
+            '--file-format', choices=['csv', 'xlsx'],
+            help='Write the rows to a file of this format and import it the way an upload is: an .xlsx is '
+                 'converted to CSV first (timed), then the CSV is streamed.',
+        )
+
+    def handle(self, *args, **options):
+        rows = [
+            {
+                'noms_et_prenoms': f'Benchmark Student {i}',
+                'matricule': f'BENCH-{i}',
+                'filiere': 'Computer Science',
+                'mention': 'Très Bien',
+                'session': '2024',
+                'sexe': 'MF'[i % 2],
+                'date_de_naissance': '2000-01-01',
+                'lieu_de_naissance': 'Paris',
+                'numero': f'BENCH-CERT-{i}',
+                'issuer_name_en': f'Benchmark Issuer {i % options["issuers"]}',
+            }
+            for i in range(options['rows'])
+        ]
+        importer = student_importer(batch_size=options['batch_size'], generate_qr=options['with_qr'])
+        path = None
+        if options['file_format']:
+            path = self.write_file(rows, options['file_format'])
+
+        qr_paths = set()
+        try:
+            with transaction.atomic():
+                last_id = Student.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    if path is None:
+                        result = importer.run(rows)
+                    else:
+                        with open(path, 'rb') as f, self.csv_path(File(f, name=path)) as csv_path:
+                            result = importer.run(import_rows(csv_path))
+                    elapsed = time.perf_counter() - start
+                if options['with_qr']:
+                    qr_paths = self.created_qr_paths(last_id)
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            if path is not None:
+                os.remove(path)
+        # Each image's address is derived from its student's id, and those
+        # students only existed in the rolled-back transaction.
+        for qr_path in qr_paths:
+            default_storage.delete(qr_path)
+
+        self.stdout.write(
+            f'{result.row_count} rows in {elapsed:.2f}s '
+            f'({result.row_count / elapsed:.0f} rows/s, {len(queries)} queries, '
+            f'{result.success_count} imported, {result.skip_count} skipped, {result.error_count} failed)'
+        )
+
+    def csv_path(self, file):
+        """The CSV process_upload would import for ``file`` (see local_csv_path())."""
+        if file.name.endswith('.xlsx'):
+            return local_csv_path(file)
+        return nullcontext(file.name)
+
+    def created_qr_paths(self, last_id):
+        """Storage paths of the QR images linked from students added after ``last_id``."""
+        links = Student.objects.filter(id__gt=last_id).values_list('qr_code_link', flat=True).iterator()
+        return {path for path in map(qr_link_path, links) if path}
+
+    def write_file(self, rows, file_format):
+        """Write ``rows`` to a temporary file of ``file_format`` and return its path."""
+        fd, path = tempfile.mkstemp(suffix=f'.{file_format}')
+        columns = list(rows[0])
+        with open(fd, 'w', encoding='utf-8', newline='') as f:
+            if file_format == 'csv':
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                writer.writerows(row.values() for row in rows)
+        if file_format == 'xlsx':
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet()
+            sheet.append(columns)
+            for row in rows:
+                sheet.append(list(row.values()))
+            workbook.save(path)
+        return path
@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from certifications.qr import (
+    clear_qr_style_cache, default_worker_count, get_qr_customization, qr_payload, qr_renderer, render_qr_images,
+)
+
+
+class Command(BaseCommand):
+    help = 'Measure QR rendering throughput (images/sec) for several process pool sizes. Nothing is stored.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--images', type=int, default=2000)
+        parser.add_argument(
+            '--workers', type=int, nargs='+',
+            help='Pool sizes to measure (default: 1, 2, 4, ... up to the core count).',
+        )
+        parser.add_argument('--format', choices=['png', 'svg'], default='png')
+        parser.add_argument(
+            '--compare-cache', action='store_true',
+            help='Also measure per-image cost with and without the customization/logo cache.',
+        )
+
+    def handle(self, *args, **options):
+        worker_counts = options['workers']
+        if not worker_counts:
+            worker_counts = [1]
+            while worker_counts[-1] * 2 <= default_worker_count():
+                worker_counts.append(worker_counts[-1] * 2)
+            if worker_counts[-1] != default_worker_count():
+                worker_counts.append(default_worker_count())
+
+        payloads = [qr_payload(student_id) for student_id in range(1, options['images'] + 1)]
+        if options['compare_cache']:
+            self.compare_cache(payloads)
+
+        baseline = None
+        for workers in worker_counts:
+            start = time.perf_counter()
+            size = sum(map(len, render_qr_images(payloads, max_workers=workers, fmt=options['format'])))
+            elapsed = time.perf_counter() - start
+            rate = len(payloads) / elapsed
+            baseline = baseline or rate
+            self.stdout.write(
+                f'{workers:>3} workers: {len(payloads)} {options["format"].upper()} images '
+                f'({size // len(payloads)} bytes each) in {elapsed:.2f}s '
+                f'({rate:.0f} images/s, {rate / baseline:.2f}x)'
+            )
+
+    def compare_cache(self, payloads):
+        def run(clear_each_time):
+            clear_qr_style_cache()
+            start = time.perf_counter()
+            for payload in payloads:
+                if clear_each_time:
+                    clear_qr_style_cache()
+                qr_renderer(get_qr_customization())(payload)
+            return (time.perf_counter() - start) * 1000 / len(payloads)
+
+        uncached = run(clear_each_time=True)
+        cached = run(clear_each_time=False)
+        self.stdout.write(
+            f'uncached: {uncached:.2f} ms/image, cached: {cached:.2f} ms/image '
+            f'(saves {uncached - cached:.2f} ms/image, {(uncached - cached) * 100 / uncached:.0f}%)'
+        )
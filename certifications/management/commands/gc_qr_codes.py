@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from certifications.models import Student
+from certifications.qr import QR_CODE_DIR, qr_link_path
+
+
+class Command(BaseCommand):
+    help = 'Delete QR code images that no student links to.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-minutes', type=int, default=60,
+            help='Keep unreferenced files younger than this (an import may not have saved its links yet).',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted.')
+
+    def handle(self, *args, **options):
+        links = Student.objects.exclude(qr_code_link__isnull=True).exclude(qr_code_link='')
+        referenced = {qr_link_path(link) for link in links.values_list('qr_code_link', flat=True).iterator()}
+        try:
+            _, files = default_storage.listdir(QR_CODE_DIR)
+        except FileNotFoundError:
+            files = []
+
+        cutoff = timezone.now() - timedelta(minutes=options['grace_minutes'])
+        deleted = freed = 0
+        for name in files:
+            path = f'{QR_CODE_DIR}/{name}'
+            if path in referenced or default_storage.get_modified_time(path) > cutoff:
+                continue
+            deleted += 1
+            freed += default_storage.size(path)
+            if not options['dry_run']:
+                default_storage.delete(path)
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {deleted} of {len(files)} files ({freed / 1024:.0f} KiB); {len(referenced)} referenced.'
+        ))
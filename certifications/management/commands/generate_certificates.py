@@ -0,0 +1,59 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from certifications.models import Issuer, Student
+from certifications.pdf import CERTIFICATE_CHUNK_SIZE, render_certificate_batches, write_certificate_zip
+
+
+class Command(BaseCommand):
+    help = (
+        'Render certificate PDFs for many students across a process pool. '
+        'Writes a ZIP of multi-page PDFs, or a single PDF when --output ends in .pdf.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Path of the .zip (or .pdf) file to write.')
+        parser.add_argument('--issuer', help='Issuer id or UUID.')
+        parser.add_argument('--session')
+        parser.add_argument('--filiere')
+        parser.add_argument('--workers', type=int, help='Worker processes (default: one per core).')
+        parser.add_argument('--chunk-size', type=int, default=CERTIFICATE_CHUNK_SIZE, help='Certificates per PDF file.')
+
+    def handle(self, *args, **options):
+        students = Student.objects.all()
+        if options['issuer']:
+            lookup = 'id' if options['issuer'].isdigit() else 'uuid'
+            try:
+                issuer = Issuer.objects.get(**{lookup: options['issuer']})
+            except (Issuer.DoesNotExist, ValidationError) as e:
+                raise CommandError(f"Unknown issuer {options['issuer']!r}") from e
+            students = students.filter(issuer=issuer)
+        if options['session']:
+            students = students.filter(session=options['session'])
+        if options['filiere']:
+            students = students.filter(filiere=options['filiere'])
+
+        count = students.count()
+        if not count:
+            raise CommandError('No students match.')
+
+        def report(done, total):
+            self.stdout.write(f'\r{done}/{total} certificates', ending='')
+            self.stdout.flush()
+
+        if options['output'].endswith('.pdf'):
+            # reportlab cannot merge finished PDFs, so a single document is
+            # drawn as one chunk by one process.
+            batches = render_certificate_batches(students, max_workers=1, chunk_size=count, on_progress=report)
+            with open(options['output'], 'wb') as output:
+                for _, pdf in batches:
+                    output.write(pdf)
+        else:
+            batches = render_certificate_batches(
+                students, max_workers=options['workers'], chunk_size=options['chunk_size'], on_progress=report,
+            )
+            with open(options['output'], 'wb') as output:
+                write_certificate_zip(batches, output)
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} certificates to {options['output']}"))
@@ -0,0 +1,34 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from certifications.jobs import UPLOAD_STALE_AFTER, claim_next_upload, process_upload
+
+
+class Command(BaseCommand):
+    help = 'Process pending CSV uploads. Runs as a polling worker unless --once is given.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit.')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to sleep when the queue is empty.')
+        parser.add_argument(
+            '--stale-minutes', type=float, default=UPLOAD_STALE_AFTER.total_seconds() / 60,
+            help='Reclaim uploads left processing without progress for this long (their worker died).',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            upload = claim_next_upload(timedelta(minutes=options['stale_minutes']))
+            if upload is None:
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f'Processing {upload}')
+            upload = process_upload(upload)
+            self.stdout.write(
+                f'{upload}: {upload.status}, {upload.successful_records} imported, '
+                f'{upload.updated_records} updated, {upload.skipped_records} unchanged, {upload.failed_records} failed'
+            )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from certifications.search import fts_enabled, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the SQLite full-text index used by student search.'
+
+    def handle(self, *args, **options):
+        if not fts_enabled():
+            self.stdout.write('Full-text index is only used on SQLite; nothing to do.')
+            return
+        rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from certifications.models import Student
+from certifications.qr import default_worker_count, ensure_qr_codes, get_qr_customization, qr_style_key
+from certifications.verification import invalidate_student_pages
+
+REGENERATE_BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-render the QR code images of all (or filtered) students, e.g. after BASE_URL or the '
+        'QR customization changed. Resumes from its checkpoint after an interruption.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--issuer', type=int, help='Only students of this issuer id.')
+        parser.add_argument('--session')
+        parser.add_argument('--workers', type=int, help='Worker processes (default: one per core).')
+        parser.add_argument('--batch-size', type=int, default=REGENERATE_BATCH_SIZE)
+        parser.add_argument(
+            '--checkpoint', default=os.path.join(settings.BASE_DIR, 'qr_regeneration_checkpoint.json'),
+            help='File recording the last finished student id (keep it out of the served MEDIA_ROOT).',
+        )
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint.')
+
+    def handle(self, *args, **options):
+        students = Student.objects.all()
+        if options['issuer']:
+            students = students.filter(issuer_id=options['issuer'])
+        if options['session']:
+            students = students.filter(session=options['session'])
+
+        # A checkpoint only applies to the same selection rendered with the same style.
+        qr_customization = get_qr_customization()
+        run = hashlib.sha256(repr([
+            options['issuer'], options['session'], settings.BASE_URL, settings.QR_ON_DEMAND,
+            qr_style_key(qr_customization), qr_customization.output_format,
+        ]).encode()).hexdigest()
+        checkpoint = self.load_checkpoint(options['checkpoint'], run, options['restart'])
+        if checkpoint['last_id']:
+            self.stdout.write(f"Resuming after student {checkpoint['last_id']}")
+
+        total = students.filter(id__gt=checkpoint['last_id']).count()
+        workers = options['workers'] or default_worker_count()
+        # With QR_ON_DEMAND nothing is rendered here: links point at the QR endpoint.
+        use_pool = workers > 1 and not settings.QR_ON_DEMAND
+        start = time.perf_counter()
+        done = 0
+        with ProcessPoolExecutor(max_workers=workers) if use_pool else nullcontext() as pool:
+            # Keyset batches from the checkpoint, so only one batch of ids is in memory.
+            while batch := list(
+                students.filter(id__gt=checkpoint['last_id']).order_by('id')
+                .values_list('id', 'qr_code_link')[:options['batch_size']]
+            ):
+                # Images already stored under their content address are reused.
+                links, rendered = ensure_qr_codes(
+                    [student_id for student_id, _ in batch], executor=pool, max_workers=workers,
+                )
+                now = timezone.now()
+                stale_links = [
+                    Student(id=student_id, qr_code_link=links[student_id], updated_at=now)
+                    for student_id, link in batch if link != links[student_id]
+                ]
+                with transaction.atomic():
+                    Student.objects.bulk_update(stale_links, ['qr_code_link', 'updated_at'])
+                invalidate_student_pages([student.id for student in stale_links])
+
+                done += len(batch)
+                checkpoint['last_id'] = batch[-1][0]
+                checkpoint['written'] += rendered
+                checkpoint['unchanged'] += len(batch) - rendered
+                self.save_checkpoint(options['checkpoint'], checkpoint)
+                rate = done / (time.perf_counter() - start)
+                self.stdout.write(f'{done}/{total} students ({rate:.0f} images/s)')
+
+        if os.path.exists(options['checkpoint']):
+            os.remove(options['checkpoint'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {checkpoint['written']} images rendered, {checkpoint['unchanged']} already up to date."
+        ))
+
+    def load_checkpoint(self, path, run, restart):
+        if not restart:
+            try:
+                with open(path) as f:
+                    checkpoint = json.load(f)
+                if checkpoint.get('run') == run:
+                    return checkpoint
+            except (OSError, ValueError):
+                pass
+        return {'run': run, 'last_id': 0, 'written': 0, 'unchanged': 0}
+
+    def save_checkpoint(self, path, checkpoint):
+        # Write then rename, so an interruption never leaves a truncated file.
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(f'{path}.tmp', path)
@@ -0,0 +1,40 @@
+# Generated by Django 4.0.6 on 2026-10-17 17:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certifications', '0011_alter_student_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='csvupload',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='csvupload',
+            name='skipped_records',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='csvupload',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        # Uploads that predate the worker are marked done so it does not pick them up.
+        migrations.AddField(
+            model_name='csvupload',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='done', max_length=20),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='csvupload',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='pending', max_length=20),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.6 on 2026-10-17 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certifications', '0012_csvupload_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['issuer', 'issue_date', 'id'], name='student_issuer_issued_idx'),
+        ),
+    ]
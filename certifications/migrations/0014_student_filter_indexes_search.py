@@ -0,0 +1,51 @@
+# Generated by Django 4.0.6 on 2026-10-17 18:07
+
+from django.db import migrations, models
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite-only; other backends search with icontains.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS certifications_student_fts "
+        "USING fts5(noms_et_prenoms, matricule, numero, filiere, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO certifications_student_fts (rowid, noms_et_prenoms, matricule, numero, filiere) "
+        "SELECT id, COALESCE(noms_et_prenoms, ''), COALESCE(matricule, ''), COALESCE(numero, ''), COALESCE(filiere, '') "
+        "FROM certifications_student"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS certifications_student_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certifications', '0013_student_issuer_issued_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['session'], name='student_session_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['filiere'], name='student_filiere_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['mention'], name='student_mention_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['issue_date'], name='student_issue_date_idx'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.0.6 on 2026-10-17 21:20
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certifications', '0014_student_filter_indexes_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificatetemplate',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.6 on 2026-10-17 22:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certifications', '0015_certificatetemplate_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='qrcodecustomization',
+            name='output_format',
+            field=models.CharField(choices=[('png', 'PNG'), ('svg', 'SVG')], default='png', max_length=3),
+        ),
+    ]
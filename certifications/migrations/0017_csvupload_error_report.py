@@ -0,0 +1,18 @@
+# Generated by Django 4.0.6 on 2026-10-17 23:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certifications', '0016_qrcodecustomization_output_format'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='csvupload',
+            name='error_report',
+            field=models.FileField(blank=True, null=True, upload_to='uploads/reports/'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.0.6 on 2026-10-17 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certifications', '0017_csvupload_error_report'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='csvupload',
+            name='mode',
+            field=models.CharField(choices=[('insert', 'Add new students only'), ('upsert', 'Add new students and update existing ones')], default='insert', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='csvupload',
+            name='updated_records',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.0.6 on 2026-10-18 09:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certifications', '0018_csvupload_mode_updated_records'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='csvupload',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
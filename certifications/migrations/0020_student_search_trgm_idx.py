@@ -0,0 +1,42 @@
+# Generated by Django 4.0.6 on 2026-10-18 14:20
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # PostgreSQL only; SQLite searches through the FTS5 table of 0014.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    # unaccent() is only STABLE (it depends on search_path); pinning the
+    # dictionary makes this wrapper safe to declare IMMUTABLE and index.
+    schema_editor.execute(
+        "CREATE OR REPLACE FUNCTION certifications_search_text(text) RETURNS text AS "
+        "$$ SELECT public.unaccent('public.unaccent'::regdictionary, lower($1)) $$ "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT"
+    )
+    # Must match SEARCH_TEXT_SQL in certifications/search.py.
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS student_search_trgm_idx ON certifications_student USING gin ("
+        "certifications_search_text(COALESCE(noms_et_prenoms, '') || ' ' || COALESCE(matricule, '') || ' ' "
+        "|| COALESCE(numero, '') || ' ' || COALESCE(filiere, '')) gin_trgm_ops)"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS student_search_trgm_idx")
+    schema_editor.execute("DROP FUNCTION IF EXISTS certifications_search_text(text)")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certifications', '0019_csvupload_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
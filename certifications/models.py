@@ -28,6 +28,7 @@ class CertificateTemplate(models.Model):
         ('bottom_left', 'Bottom Left'),
         ('bottom_right', 'Bottom Right'),
     ], default='bottom_right')
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -53,17 +54,36 @@ class Student(models.Model):
     issue_date = models.DateTimeField('Date de Délivrance', blank=True, null=True, auto_now_add=True)
     template = models.ForeignKey(CertificateTemplate, on_delete=models.SET_NULL, null=True, blank=True)
     qr_code_link = models.URLField('Lien QR Code', max_length=255, unique=True, blank=True, null=True)
+    # Version of everything the public pages show (issuer name included):
+    # cached pages and ETags are checked against it, so a write made by any
+    # process is seen by all of them. Bulk writes set it explicitly.
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ['noms_et_prenoms', 'matricule', 'filiere', 'session']
+        indexes = [
+            # Keyset pagination of an issuer's students on verify_issuer.
+            models.Index(fields=['issuer', 'issue_date', 'id'], name='student_issuer_issued_idx'),
+            # Filter bar on the index page.
+            models.Index(fields=['session'], name='student_session_idx'),
+            models.Index(fields=['filiere'], name='student_filiere_idx'),
+            models.Index(fields=['mention'], name='student_mention_idx'),
+            models.Index(fields=['issue_date'], name='student_issue_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.noms_et_prenoms or ''} | {self.matricule or ''}"
 
 class QRCodeCustomization(models.Model):
+    OUTPUT_FORMAT_CHOICES = [
+        ('png', 'PNG'),
+        ('svg', 'SVG'),
+    ]
+
     logo = models.ImageField(upload_to='qr_logos', blank=True, null=True)
     foreground_color = models.CharField(max_length=7, default='#000000')
     background_color = models.CharField(max_length=7, default='#FFFFFF')
+    output_format = models.CharField(max_length=3, choices=OUTPUT_FORMAT_CHOICES, default='png')
 
     def __str__(self):
         return f"QR Code Customization {self.id}"
@@ -76,16 +96,44 @@ class SampleCSV(models.Model):
         return f"Sample CSV {self.id} - {self.created_at}"
 
 class CSVUpload(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    MODE_CHOICES = [
+        ('insert', 'Add new students only'),
+        ('upsert', 'Add new students and update existing ones'),
+    ]
+
     file = models.FileField(upload_to='uploads/csv/')
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default='insert')
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Bumped by the worker after every batch; a processing upload that stops
+    # changing was abandoned by a dead worker and can be claimed again.
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
     processed = models.BooleanField(default=False)
     total_records = models.IntegerField(default=0)
     successful_records = models.IntegerField(default=0)
+    updated_records = models.IntegerField(default=0)
+    skipped_records = models.IntegerField(default=0)
     failed_records = models.IntegerField(default=0)
     error_log = models.TextField(blank=True)
+    error_report = models.FileField(upload_to='uploads/reports/', blank=True, null=True)
 
     def __str__(self):
         return f"CSV Upload {self.id} - {self.uploaded_at}"
 
+    @property
+    def progress(self):
+        if not self.total_records:
+            return 100 if self.processed else 0
+        done = self.successful_records + self.updated_records + self.skipped_records + self.failed_records
+        return min(100, done * 100 // self.total_records)
+
     class Meta:
         ordering = ['-uploaded_at']
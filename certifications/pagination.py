@@ -0,0 +1,118 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import DateTimeField, Q
+from django.utils import timezone
+
+# Largest primary key any backend stores; a tampered cursor beyond it would
+# overflow the query parameter instead of simply matching nothing.
+MAX_CURSOR_PK = 2 ** 63 - 1
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Seek pagination over ``queryset`` ordered by ``(field, id)`` descending.
+
+    Each page is a ``WHERE (field, id) < cursor ... LIMIT n`` index range scan,
+    so page N costs the same as page 1, unlike OFFSET. ``field`` may be
+    nullable; NULLs are placed where the database sorts them natively so an
+    index on ``(field, id)`` still serves the ordering.
+    """
+
+    def __init__(self, queryset, per_page, field='id'):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.field = field
+
+    def page(self, after=None, before=None):
+        """Return the page after cursor ``after``, before cursor ``before``, or the first page."""
+        cursor = self.parse_cursor(before) if before is not None else None
+        if cursor is not None:
+            rows = list(self.ordered(descending=False).filter(self.seek(*cursor, 'gt'))[:self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            return KeysetPage(
+                rows,
+                self.cursor(rows[-1]) if rows else None,
+                self.cursor(rows[0]) if rows and has_previous else None,
+            )
+
+        queryset = self.ordered(descending=True)
+        cursor = self.parse_cursor(after) if after is not None else None
+        if cursor is not None:
+            queryset = queryset.filter(self.seek(*cursor, 'lt'))
+        rows = list(queryset[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return KeysetPage(
+            rows,
+            self.cursor(rows[-1]) if rows and has_next else None,
+            self.cursor(rows[0]) if rows and cursor is not None else None,
+        )
+
+    def ordered(self, descending):
+        if self.field == 'id':
+            return self.queryset.order_by('-id' if descending else 'id')
+        if descending:
+            return self.queryset.order_by(f'-{self.field}', '-id')
+        return self.queryset.order_by(self.field, 'id')
+
+    def seek(self, value, pk, op):
+        """Rows strictly past ``(value, pk)`` in the ``op`` ('lt' or 'gt') direction."""
+        if self.field == 'id':
+            return Q(**{f'id__{op}': pk})
+        nulls_largest = connection.features.nulls_order_largest
+        if value is not None:
+            condition = Q(**{f'{self.field}__{op}': value}) | Q(**{self.field: value, f'id__{op}': pk})
+            if (op == 'gt') == nulls_largest:
+                condition |= Q(**{f'{self.field}__isnull': True})
+        else:
+            condition = Q(**{f'{self.field}__isnull': True, f'id__{op}': pk})
+            if (op == 'lt') == nulls_largest:
+                condition |= Q(**{f'{self.field}__isnull': False})
+        return condition
+
+    def cursor(self, obj):
+        if self.field == 'id':
+            return str(obj.pk)
+        value = getattr(obj, self.field)
+        return f"{value.isoformat() if value is not None else ''}_{obj.pk}"
+
+    def parse_cursor(self, cursor):
+        """Return ``(value, pk)`` or None when the cursor is malformed."""
+        try:
+            if self.field == 'id':
+                value, pk = None, int(cursor)
+            else:
+                value, pk = cursor.rsplit('_', 1)
+                model_field = self.queryset.model._meta.get_field(self.field)
+                value, pk = (model_field.to_python(value) if value else None), int(pk)
+                if settings.USE_TZ and isinstance(model_field, DateTimeField) and value and timezone.is_naive(value):
+                    value = timezone.make_aware(value)
+        except (ValueError, TypeError, ValidationError):
+            return None
+        if abs(pk) > MAX_CURSOR_PK:
+            return None
+        return value, pk
@@ -0,0 +1,402 @@
+import hashlib
+import io
+import os
+import re
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from functools import lru_cache
+
+import arabic_reshaper
+from bidi.algorithm import get_display
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+from reportlab.lib.colors import HexColor
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from certifications.models import CertificateTemplate
+from certifications.importers import iter_batches
+from certifications.qr import default_worker_count, get_qr_customization, qr_payload, qr_renderer
+
+PAGE_SIZE = landscape(A4)
+PAGE_MARGIN = 40
+QR_SIZE = 110
+# Certificates per worker task, and per PDF file in a batch ZIP.
+CERTIFICATE_CHUNK_SIZE = 100
+# Resolution the template background is pre-scaled to, and where the scaled
+# copies are kept (one file per template version).
+TEMPLATE_LAYER_DPI = 150
+TEMPLATE_LAYER_DIR = 'certificate_templates/rendered'
+TEMPLATE_LAYER_CACHE_SIZE = 16
+# Stored single-student certificates, one directory per student id.
+CERTIFICATE_DIR = 'certificates'
+
+_template_layers = OrderedDict()
+
+# Almarai covers Latin and Arabic; the other families are reportlab built-ins.
+ALMARAI_FONTS = {
+    'Almarai': 'Almarai-Regular.ttf',
+    'Almarai-Bold': 'Almarai-Bold.ttf',
+}
+FONT_FAMILIES = {
+    'Almarai': ('Almarai', 'Almarai-Bold'),
+    'Helvetica': ('Helvetica', 'Helvetica-Bold'),
+    'Times-Roman': ('Times-Roman', 'Times-Bold'),
+    'Courier': ('Courier', 'Courier-Bold'),
+}
+ARABIC_RE = re.compile('[\u0600-\u06FF\u0750-\u077F\uFB50-\uFDFF\uFE70-\uFEFF]')
+
+
+@lru_cache(maxsize=None)
+def register_fonts():
+    """Register the Almarai TTFs from ``static/`` once per process."""
+    for name, filename in ALMARAI_FONTS.items():
+        pdfmetrics.registerFont(TTFont(name, os.path.join(settings.BASE_DIR, 'static', filename)))
+
+
+@lru_cache(maxsize=32)
+def load_image(path, mtime):
+    """Decode an image file once per process and file version."""
+    return ImageReader(path)
+
+
+def image_reader(field_file):
+    """Cached ImageReader for an ImageField value, or None when it is empty or missing."""
+    if not field_file:
+        return None
+    try:
+        path = field_file.path
+        return load_image(path, os.path.getmtime(path))
+    except (OSError, NotImplementedError, ValueError):
+        return None
+
+
+def shape_text(text):
+    """Reshape and reorder Arabic text for left-to-right drawing."""
+    text = str(text or '')
+    if ARABIC_RE.search(text):
+        return get_display(arabic_reshaper.reshape(text))
+    return text
+
+
+def qr_position(position, width, height):
+    if position == 'top_left':
+        return PAGE_MARGIN, height - PAGE_MARGIN - QR_SIZE
+    if position == 'top_right':
+        return width - PAGE_MARGIN - QR_SIZE, height - PAGE_MARGIN - QR_SIZE
+    if position == 'bottom_left':
+        return PAGE_MARGIN, PAGE_MARGIN
+    return width - PAGE_MARGIN - QR_SIZE, PAGE_MARGIN
+
+
+def certificate_lines(student):
+    """Body lines drawn under the student's name."""
+    lines = [
+        f"Filière : {student.filiere or ''}",
+        f"Mention : {student.mention or ''}",
+        f"Session : {student.session or ''}",
+    ]
+    if student.date_de_naissance or student.lieu_de_naissance:
+        birth = 'Né(e)'
+        if student.date_de_naissance:
+            birth += f" le {student.date_de_naissance:%d/%m/%Y}"
+        if student.lieu_de_naissance:
+            birth += f" à {student.lieu_de_naissance}"
+        lines.append(birth)
+    return lines
+
+
+@dataclass(frozen=True)
+class TemplateLayer:
+    """The parts of a certificate page that depend only on the template."""
+    name: str
+    background: ImageReader
+    regular: str
+    bold: str
+    color: HexColor
+    title_font_size: int
+    body_font_size: int
+    qr_position: tuple
+
+
+def template_version(template):
+    """Hash of the template fields that affect the drawn page."""
+    parts = [
+        template.updated_at, template.background_image.name, template.font, template.title_font_size,
+        template.body_font_size, template.text_color, template.qr_code_position,
+    ]
+    return hashlib.sha256(repr(parts).encode()).hexdigest()[:16]
+
+
+def template_layer_path(template_id, version):
+    return f"{TEMPLATE_LAYER_DIR}/{template_id or 'default'}_{version}.jpg"
+
+
+def scaled_background(template, version):
+    """
+    Return the template background scaled to the page as JPEG bytes, or None.
+
+    The scaled copy is stored next to the uploads, so worker processes and
+    restarts reuse it instead of decoding and resampling the original again.
+    """
+    if not template.background_image:
+        return None
+    path = template_layer_path(template.pk, version)
+    if default_storage.exists(path):
+        with default_storage.open(path, 'rb') as f:
+            return f.read()
+    try:
+        with template.background_image.open('rb') as f, Image.open(f) as image:
+            size = tuple(round(side * TEMPLATE_LAYER_DPI / 72) for side in PAGE_SIZE)
+            buffer = io.BytesIO()
+            image.convert('RGB').resize(size, Image.LANCZOS).save(buffer, format='JPEG', quality=90)
+    except (OSError, ValueError):
+        return None
+    default_storage.save(path, ContentFile(buffer.getvalue()))
+    return buffer.getvalue()
+
+
+def build_template_layer(template, version):
+    register_fonts()
+    background = scaled_background(template, version)
+    width, height = PAGE_SIZE
+    regular, bold = FONT_FAMILIES.get(template.font, FONT_FAMILIES['Almarai'])
+    return TemplateLayer(
+        name=f"template_{template.pk or 'default'}_{version}",
+        background=ImageReader(io.BytesIO(background)) if background else None,
+        regular=regular,
+        bold=bold,
+        color=HexColor(template.text_color or '#000000'),
+        title_font_size=template.title_font_size,
+        body_font_size=template.body_font_size,
+        qr_position=qr_position(template.qr_code_position, width, height),
+    )
+
+
+def template_layer(template):
+    """Pre-built layer for ``template``, cached in memory (LRU) and on disk per version."""
+    key = (template.pk, template_version(template))
+    layer = _template_layers.get(key)
+    if layer is None:
+        layer = _template_layers[key] = build_template_layer(template, key[1])
+        if len(_template_layers) > TEMPLATE_LAYER_CACHE_SIZE:
+            _template_layers.popitem(last=False)
+    else:
+        _template_layers.move_to_end(key)
+    return layer
+
+
+def clear_template_layer_cache(template_id=None):
+    """Forget cached layers; with ``template_id``, also delete its scaled backgrounds."""
+    _template_layers.clear()
+    if template_id is None:
+        return
+    try:
+        _, files = default_storage.listdir(TEMPLATE_LAYER_DIR)
+    except FileNotFoundError:
+        return
+    for name in files:
+        if name.startswith(f'{template_id}_'):
+            default_storage.delete(f'{TEMPLATE_LAYER_DIR}/{name}')
+
+
+def draw_template_layer(pdf, layer):
+    """
+    Draw the static layer, defined once per document as a reusable form.
+
+    Every page of a batch PDF then references the same background and title
+    instead of repeating them.
+    """
+    if not pdf.hasForm(layer.name):
+        width, height = PAGE_SIZE
+        pdf.beginForm(layer.name)
+        if layer.background:
+            pdf.drawImage(layer.background, 0, 0, width=width, height=height)
+        pdf.setFillColor(layer.color)
+        pdf.setFont(layer.bold, layer.title_font_size + 8)
+        pdf.drawCentredString(width / 2, height - 130, 'Certificat')
+        pdf.endForm()
+    pdf.doForm(layer.name)
+
+
+def draw_certificate(pdf, student, template, qr_png):
+    """Draw one certificate page for ``student`` on a reportlab canvas."""
+    width, height = PAGE_SIZE
+    layer = template_layer(template)
+    draw_template_layer(pdf, layer)
+
+    lines = certificate_lines(student)
+    regular, bold = layer.regular, layer.bold
+    if any(ARABIC_RE.search(str(text or '')) for text in [student.noms_et_prenoms, student.issuer.name_en] + lines):
+        regular, bold = FONT_FAMILIES['Almarai']
+
+    pdf.setFillColor(layer.color)
+    pdf.setFont(regular, layer.body_font_size)
+    pdf.drawCentredString(width / 2, height - 175, shape_text(f"{student.issuer.name_en} certifie que"))
+    pdf.setFont(bold, layer.title_font_size)
+    pdf.drawCentredString(width / 2, height - 230, shape_text(student.noms_et_prenoms))
+
+    pdf.setFont(regular, layer.body_font_size)
+    y = height - 280
+    for line in lines:
+        pdf.drawCentredString(width / 2, y, shape_text(line))
+        y -= layer.body_font_size * 1.6
+
+    pdf.setFont(regular, layer.body_font_size - 4)
+    pdf.drawString(PAGE_MARGIN + 150, PAGE_MARGIN + 10, shape_text(f"Numéro : {student.numero or ''}"))
+    if student.issue_date:
+        pdf.drawRightString(width - PAGE_MARGIN - 150, PAGE_MARGIN + 10, f"Délivré le {student.issue_date:%d/%m/%Y}")
+
+    signature = image_reader(student.issuer.signature)
+    if signature:
+        pdf.drawImage(signature, width / 2 - 75, PAGE_MARGIN, width=150, height=60, mask='auto', preserveAspectRatio=True)
+
+    x, y = layer.qr_position
+    pdf.drawImage(ImageReader(io.BytesIO(qr_png)), x, y, width=QR_SIZE, height=QR_SIZE)
+
+
+def student_template(student):
+    # Students without a template get the model defaults.
+    return student.template or CertificateTemplate(name='Default')
+
+
+def certificate_digest(student, template):
+    """Hash of everything drawn on the certificate, used to name the stored PDF."""
+    qr_customization = get_qr_customization()
+    parts = [
+        student.noms_et_prenoms, student.matricule, student.filiere, student.mention, student.session,
+        student.date_de_naissance, student.lieu_de_naissance, student.numero, student.issue_date,
+        student.issuer.name_en, student.issuer.signature.name,
+        template.pk, template_version(template),
+        settings.BASE_URL, qr_customization.pk, qr_customization.foreground_color,
+        qr_customization.background_color, qr_customization.logo.name,
+    ]
+    return hashlib.sha256(repr(parts).encode()).hexdigest()[:16]
+
+
+def certificate_path(student, template):
+    return f'{CERTIFICATE_DIR}/{student.id}/{certificate_digest(student, template)}.pdf'
+
+
+def render_certificates_pdf(students, render_qr, title='Certificats'):
+    """
+    Render one page per student into a single PDF and return the bytes.
+
+    Needs no ORM access when ``students`` were loaded with their issuer and
+    template, so it can run in a worker process.
+    """
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=PAGE_SIZE)
+    pdf.setTitle(title)
+    for student in students:
+        draw_certificate(pdf, student, student_template(student), render_qr(qr_payload(student.id)))
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def render_certificate_pdf(student):
+    """Render a single-page certificate PDF for ``student`` and return the bytes."""
+    return render_certificates_pdf(
+        [student], qr_renderer(get_qr_customization()),
+        title=f"Certificat - {student.noms_et_prenoms or student.id}",
+    )
+
+
+def get_certificate_pdf(student):
+    """
+    Return the storage path of ``student``'s certificate, rendering it if needed.
+
+    The file name is a digest of the drawn content, so an unchanged certificate
+    is a file read and any edit produces a new file. Older versions in the
+    student's directory are removed when a new one is written.
+    """
+    path = certificate_path(student, student_template(student))
+    if default_storage.exists(path):
+        return path
+
+    directory = os.path.dirname(path)
+    try:
+        _, old_files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        old_files = []
+    default_storage.save(path, ContentFile(render_certificate_pdf(student)))
+    for name in old_files:
+        default_storage.delete(f'{directory}/{name}')
+    return path
+
+
+def delete_certificate_pdfs(student_ids):
+    """
+    Remove the stored certificates of deleted students.
+
+    ``certificates/`` is listed once, so only students that ever had a PDF
+    rendered cost a further listing and the deletes.
+    """
+    try:
+        directories, _ = default_storage.listdir(CERTIFICATE_DIR)
+    except FileNotFoundError:
+        return
+    for name in set(directories) & {str(student_id) for student_id in student_ids}:
+        directory = f'{CERTIFICATE_DIR}/{name}'
+        _, files = default_storage.listdir(directory)
+        for file_name in files:
+            default_storage.delete(f'{directory}/{file_name}')
+        # Removes the emptied directory on the filesystem storage.
+        default_storage.delete(directory)
+
+
+def certificate_batch_queryset(students):
+    return students.select_related('issuer', 'template').order_by('id')
+
+
+def render_certificate_batches(students, max_workers=None, chunk_size=CERTIFICATE_CHUNK_SIZE, on_progress=None):
+    """
+    Render certificates for a Student queryset in chunks of ``chunk_size`` pages.
+
+    Chunks are rendered by a pool of ``max_workers`` processes (default: one
+    per core), each into its own multi-page PDF. Yields ``(chunk_index, pdf)``
+    as chunks finish, so not necessarily in order, and calls
+    ``on_progress(pages_done, pages_total)`` after each one.
+    """
+    students = list(certificate_batch_queryset(students))
+    render_qr = qr_renderer(get_qr_customization())
+    chunks = list(iter_batches(students, chunk_size))
+    workers = min(max_workers or default_worker_count(), len(chunks))
+    done = 0
+
+    if workers <= 1:
+        for index, chunk in enumerate(chunks):
+            pdf = render_certificates_pdf(chunk, render_qr)
+            done += len(chunk)
+            if on_progress:
+                on_progress(done, len(students))
+            yield index, pdf
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(render_certificates_pdf, chunk, render_qr): (index, len(chunk))
+            for index, chunk in enumerate(chunks)
+        }
+        for future in as_completed(futures):
+            index, size = futures[future]
+            pdf = future.result()
+            done += size
+            if on_progress:
+                on_progress(done, len(students))
+            yield index, pdf
+
+
+def write_certificate_zip(batches, fileobj, prefix='certificats'):
+    """Write rendered ``(chunk_index, pdf)`` batches into a ZIP, one PDF per chunk."""
+    with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_STORED) as zip_file:
+        for index, pdf in batches:
+            zip_file.writestr(f'{prefix}_{index + 1:04d}.pdf', pdf)
@@ -0,0 +1,326 @@
+import base64
+import hashlib
+import io
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from urllib.parse import unquote, urlparse
+
+import qrcode
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from certifications.models import QRCodeCustomization
+from PIL import Image
+
+QR_CODE_DIR = 'qr_codes'
+# Formats and pixel sizes the QR endpoint serves. Without a size it returns
+# the native rendering (10 px per module, so it grows with the payload).
+QR_FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+QR_MIN_SIZE = 64
+QR_MAX_SIZE = 2048
+# Rendered images kept in memory per process by get_qr_image().
+QR_MEMORY_CACHE_SIZE = 256
+# Pixel size the logo is encoded at inside SVG output.
+QR_SVG_LOGO_SIZE = 128
+# Below this many images the process pool start-up costs more than it saves.
+QR_POOL_MIN_BATCH = 32
+# Payloads handed to a pool worker per task.
+QR_POOL_CHUNKSIZE = 64
+# Seconds a process trusts its cached customization. Saves made in this
+# process clear it at once (see signals.py); this bounds staleness for
+# changes made by other processes.
+QR_STYLE_CACHE_TTL = 60
+
+_qr_customization_cache = None
+
+def get_qr_customization():
+    """Return the QRCodeCustomization in use, cached per process."""
+    global _qr_customization_cache
+    if _qr_customization_cache is not None:
+        qr_customization, loaded_at = _qr_customization_cache
+        if time.monotonic() - loaded_at < QR_STYLE_CACHE_TTL:
+            return qr_customization
+
+    qr_customization = QRCodeCustomization.objects.first()
+    if not qr_customization:
+        qr_customization = QRCodeCustomization.objects.create()
+    _qr_customization_cache = (qr_customization, time.monotonic())
+    return qr_customization
+
+def clear_qr_style_cache():
+    global _qr_customization_cache
+    _qr_customization_cache = None
+    load_qr_logo.cache_clear()
+    load_qr_logo_data_uri.cache_clear()
+    get_qr_image.cache_clear()
+
+@lru_cache(maxsize=16)
+def load_qr_logo(customization_id, logo_path, logo_mtime, size):
+    """
+    Decode the logo and resize it to ``size`` as RGBA.
+
+    Cached per process; ``logo_mtime`` is part of the key so replacing the
+    file on disk is picked up without an explicit invalidation.
+    """
+    with Image.open(logo_path) as logo:
+        return logo.convert('RGBA').resize(size, Image.LANCZOS)
+
+def qr_payload(student_id):
+    return f"{settings.BASE_URL}/certificate/student-qr-info/{student_id}/"
+
+def qr_style_key(qr_customization):
+    """Everything besides the payload that changes the rendered image."""
+    return repr((qr_customization.foreground_color, qr_customization.background_color, qr_customization.logo.name))
+
+def qr_code_path(payload, style_key, fmt='png', size=None):
+    """
+    Content address of a QR image: a hash of the payload and the style.
+
+    Re-rendering the same student with the same style maps to the same file,
+    so regeneration is idempotent and never leaves renamed copies behind.
+    Other formats and sizes (served by the on-demand endpoint) get their own
+    address, used as the endpoint's ETag; only native sizes are stored. The
+    default PNG keeps the address the stored links use.
+    """
+    key = f'{payload}\n{style_key}'
+    if fmt != 'png' or size:
+        key += f'\n{fmt}\n{size}'
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return f'{QR_CODE_DIR}/{digest[:32]}.{fmt}'
+
+def qr_endpoint_link(student_id, fmt='png'):
+    return settings.BASE_URL + reverse('certifications:student_qr_image', args=[student_id, fmt])
+
+def qr_link(path):
+    return f"{settings.BASE_URL}{settings.MEDIA_URL}{path}"
+
+def qr_link_path(link):
+    """Storage path a ``qr_code_link`` points to, or None if it is not a media URL."""
+    if not link:
+        return None
+    path = unquote(urlparse(link).path)
+    if not path.startswith(settings.MEDIA_URL):
+        return None
+    return path[len(settings.MEDIA_URL):]
+
+def render_qr_png(data, foreground_color, background_color, logo_path=None, logo_mtime=None, customization_id=None,
+                  size=None):
+    """
+    Render ``data`` as a PNG QR code and return the encoded bytes.
+
+    Pure function of its arguments (no ORM or storage access) so it can run
+    in a worker process.
+    """
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    qr_img = qr.make_image(fill_color=foreground_color, back_color=background_color)
+
+    if logo_path:
+        logo_size = (qr_img.size[0] // 4, qr_img.size[1] // 4)
+        logo = load_qr_logo(customization_id, logo_path, logo_mtime, logo_size)
+        pos = ((qr_img.size[0] - logo.size[0]) // 2, (qr_img.size[1] - logo.size[1]) // 2)
+        qr_img.paste(logo, pos, logo)
+
+    if size and size != qr_img.size[0]:
+        qr_img = qr_img.resize((size, size), Image.NEAREST)
+
+    qr_buffer = io.BytesIO()
+    qr_img.save(qr_buffer, format="PNG")
+    return qr_buffer.getvalue()
+
+@lru_cache(maxsize=16)
+def load_qr_logo_data_uri(customization_id, logo_path, logo_mtime):
+    """The logo as a ``data:`` URI for embedding in SVG output, cached like load_qr_logo()."""
+    logo = load_qr_logo(customization_id, logo_path, logo_mtime, (QR_SVG_LOGO_SIZE, QR_SVG_LOGO_SIZE))
+    buffer = io.BytesIO()
+    logo.save(buffer, format='PNG')
+    return 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+def render_qr_svg(data, foreground_color, background_color, logo_path=None, logo_mtime=None, customization_id=None,
+                  size=None):
+    """
+    Render ``data`` as a standalone SVG QR code and return the bytes.
+
+    Dark modules are merged into one path of horizontal runs, which keeps the
+    file small, and no raster work is done except for the logo, which is
+    encoded once per process and embedded in the centre.
+    """
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    modules = qr.get_matrix()
+    dimension = len(modules)
+    # Each run of dark modules is a 1-unit-wide stroke along the row's centre
+    # line, positioned relative to the end of the previous run.
+    runs = []
+    for y, row in enumerate(modules):
+        end = None
+        x = 0
+        while x < dimension:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < dimension and row[x]:
+                x += 1
+            runs.append(f'M{start} {y}.5h{x - start}' if end is None else f'm{start - end} 0h{x - start}')
+            end = x
+
+    logo = ''
+    if logo_path:
+        logo_size = dimension / 4
+        offset = (dimension - logo_size) / 2
+        href = load_qr_logo_data_uri(customization_id, logo_path, logo_mtime)
+        logo = f'<image href="{href}" x="{offset}" y="{offset}" width="{logo_size}" height="{logo_size}"/>'
+
+    pixels = size or dimension * 10
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{pixels}" height="{pixels}" '
+        f'viewBox="0 0 {dimension} {dimension}" shape-rendering="crispEdges">'
+        f'<rect width="{dimension}" height="{dimension}" fill="{background_color}"/>'
+        f'<path stroke="{foreground_color}" d="{"".join(runs)}"/>{logo}</svg>'
+    ).encode()
+
+def qr_renderer(qr_customization, fmt='png', size=None):
+    """Return a picklable ``render(data) -> bytes`` bound to the customization."""
+    logo_path = logo_mtime = None
+    if qr_customization.logo:
+        logo_path = qr_customization.logo.path
+        logo_mtime = os.path.getmtime(logo_path)
+    return partial(
+        render_qr_svg if fmt == 'svg' else render_qr_png,
+        foreground_color=qr_customization.foreground_color,
+        background_color=qr_customization.background_color,
+        logo_path=logo_path,
+        logo_mtime=logo_mtime,
+        customization_id=qr_customization.id,
+        size=size,
+    )
+
+def save_atomic(path, content):
+    """
+    Write ``content`` to ``path``, replacing any existing file in one step.
+
+    On the filesystem the bytes go to a temporary file that is renamed over
+    ``path``, so readers never see a partial image. ``default_storage.save()``
+    cannot be used for this: it never overwrites and picks a new name instead.
+    """
+    try:
+        full_path = default_storage.path(path)
+    except NotImplementedError:
+        # Remote storages upload each object in a single request.
+        default_storage.delete(path)
+        default_storage.save(path, ContentFile(content))
+        return
+    directory = os.path.dirname(full_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.chmod(tmp_path, settings.FILE_UPLOAD_PERMISSIONS or 0o644)
+        os.replace(tmp_path, full_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def store_qr_image(path, image):
+    """Save a rendered QR code to media storage and return its full URL."""
+    save_atomic(path, image)
+    return qr_link(path)
+
+@lru_cache(maxsize=QR_MEMORY_CACHE_SIZE)
+def get_qr_image(payload, style_key, fmt, size):
+    """
+    Return the ``fmt`` image of ``payload`` at ``size`` pixels.
+
+    Served from a per-process LRU, then, for the native size, from the
+    content-addressed file in storage. Only the native rendering is stored:
+    resized images are rendered into the LRU, so requests for arbitrary sizes
+    cannot fill the storage.
+    """
+    if size is not None:
+        return qr_renderer(get_qr_customization(), fmt, size)(payload)
+    path = qr_code_path(payload, style_key, fmt)
+    try:
+        with default_storage.open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    content = qr_renderer(get_qr_customization(), fmt, size)(payload)
+    save_atomic(path, content)
+    return content
+
+def generate_qr_code(student_id):
+    """Generate a single QR code for a student"""
+    return generate_qr_codes([student_id])[student_id]
+
+def default_worker_count():
+    return os.cpu_count() or 1
+
+def render_qr_images(payloads, executor=None, max_workers=None, fmt='png'):
+    """
+    Render many payloads, fanning out over a process pool.
+
+    Uses ``executor`` when given (so callers can reuse one pool across batches),
+    otherwise starts a pool of ``max_workers`` (default: one per core) for this
+    call. Small batches are rendered inline. Returns ``fmt`` image bytes in
+    input order.
+    """
+    render = qr_renderer(get_qr_customization(), fmt)
+    payloads = list(payloads)
+    workers = max_workers or default_worker_count()
+    if executor is None and (workers <= 1 or len(payloads) < QR_POOL_MIN_BATCH):
+        return [render(payload) for payload in payloads]
+    # Keep several chunks per worker so a slow chunk does not idle the others.
+    chunksize = max(1, min(QR_POOL_CHUNKSIZE, len(payloads) // (workers * 4)))
+    if executor is not None:
+        return list(executor.map(render, payloads, chunksize=chunksize))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(render, payloads, chunksize=chunksize))
+
+def generate_qr_codes(student_ids, executor=None, max_workers=None):
+    """
+    Generate QR codes for many students.
+
+    Images already stored under their content address are reused; the rest are
+    rendered in worker processes and written from the calling process.
+    Returns a ``{student_id: qr_code_url}`` dict.
+    """
+    return ensure_qr_codes(student_ids, executor, max_workers)[0]
+
+def ensure_qr_codes(student_ids, executor=None, max_workers=None):
+    """generate_qr_codes(), also returning how many images had to be rendered."""
+    qr_customization = get_qr_customization()
+    fmt = qr_customization.output_format
+    if settings.QR_ON_DEMAND:
+        # Images are rendered by the QR endpoint on first request.
+        return {student_id: qr_endpoint_link(student_id, fmt) for student_id in student_ids}, 0
+    style_key = qr_style_key(qr_customization)
+    paths = {student_id: qr_code_path(qr_payload(student_id), style_key, fmt) for student_id in student_ids}
+    missing = [student_id for student_id, path in paths.items() if not default_storage.exists(path)]
+    images = render_qr_images(
+        (qr_payload(student_id) for student_id in missing),
+        executor=executor,
+        max_workers=max_workers,
+        fmt=fmt,
+    )
+    for student_id, image in zip(missing, images):
+        store_qr_image(paths[student_id], image)
+    return {student_id: qr_link(path) for student_id, path in paths.items()}, len(missing)
@@ -0,0 +1,183 @@
+import codecs
+import csv
+import datetime
+import io
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from openpyxl import load_workbook
+
+# Bytes inspected to pick the encoding of an import file.
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+# Byte order marks, longest first so UTF-32 is not mistaken for UTF-16.
+BOM_ENCODINGS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+# Codec error handler registered below. Bytes that do not decode in the
+# sniffed encoding are read as Windows-1252 rather than failing the import:
+# a file that looked like UTF-8 in its first ENCODING_SAMPLE_SIZE bytes may
+# still hold Excel-saved cp1252 text further down.
+CP1252_FALLBACK_ERRORS = 'certifications.cp1252_fallback'
+# Encodings decoded with that fallback. UTF-16/32 stay strict, since their
+# bytes mean nothing as cp1252.
+CP1252_FALLBACK_ENCODINGS = {'utf-8', 'utf-8-sig', 'cp1252'}
+
+
+def decode_as_cp1252(error):
+    """
+    Decode the bytes ``error`` is about as Windows-1252.
+
+    cp1252 leaves 0x81, 0x8D, 0x8F, 0x90 and 0x9D undefined; like browsers,
+    those map to the code point of the same value.
+    """
+    text = []
+    for byte in error.object[error.start:error.end]:
+        try:
+            text.append(bytes([byte]).decode('cp1252'))
+        except UnicodeDecodeError:
+            text.append(chr(byte))
+    return ''.join(text), error.end
+
+
+codecs.register_error(CP1252_FALLBACK_ERRORS, decode_as_cp1252)
+
+
+def sniff_encoding(sample):
+    """Guess the text encoding of a file from its first bytes."""
+    for bom, encoding in BOM_ENCODINGS:
+        if sample.startswith(bom):
+            return encoding
+    try:
+        # Not final: the sample may end in the middle of a character.
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+    except UnicodeDecodeError:
+        return 'cp1252'
+    return 'utf-8'
+
+
+def open_text(binary_file):
+    """
+    Wrap a binary file in a decoding text stream, sniffing the encoding.
+
+    The file is decoded incrementally as it is read, so only the current
+    buffer is ever held in memory. Bytes invalid in the sniffed encoding are
+    read as cp1252 (see decode_as_cp1252).
+    """
+    encoding = sniff_encoding(binary_file.read(ENCODING_SAMPLE_SIZE))
+    binary_file.seek(0)
+    errors = CP1252_FALLBACK_ERRORS if encoding in CP1252_FALLBACK_ENCODINGS else 'strict'
+    return io.TextIOWrapper(binary_file, encoding=encoding, errors=errors, newline='')
+
+
+def iter_csv_rows(binary_file):
+    """Yield the rows of a CSV file as dicts keyed by its header, streaming from disk."""
+    yield from csv.DictReader(open_text(binary_file))
+
+
+def xlsx_cell_text(value):
+    """Render a cell value the way the same cell reads in a CSV export."""
+    if value is None:
+        return ''
+    if isinstance(value, datetime.datetime) and value.time() == datetime.time():
+        return value.date().isoformat()
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        # Matricules and numeros typed as numbers come back as floats.
+        return str(int(value))
+    return str(value).strip()
+
+
+def iter_xlsx_table(binary_file):
+    """
+    Yield the header, then each non-blank row, of the first sheet of an .xlsx file as lists of text.
+
+    Columns without a header are dropped and short rows are padded with ''.
+    Uses openpyxl's read-only mode, which parses the sheet XML as it is
+    iterated instead of building the whole workbook in memory.
+    """
+    workbook = load_workbook(binary_file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [xlsx_cell_text(value) for value in next(rows, ())]
+        columns = [index for index, column in enumerate(header) if column]
+        yield [header[index] for index in columns]
+        for values in rows:
+            if all(value is None for value in values):
+                continue
+            yield [xlsx_cell_text(values[index]) if index < len(values) else '' for index in columns]
+    finally:
+        workbook.close()
+
+
+def iter_xlsx_rows(binary_file):
+    """Yield the rows of the first sheet of an .xlsx file as dicts keyed by its header."""
+    table = iter_xlsx_table(binary_file)
+    header = next(table)
+    for values in table:
+        yield dict(zip(header, values))
+
+
+# Import file readers by extension: iter_rows(binary_file) yields row dicts.
+IMPORT_READERS = {
+    '.csv': iter_csv_rows,
+    '.xlsx': iter_xlsx_rows,
+}
+
+
+def import_reader(filename):
+    """Return the ``iter_rows`` function for an import file, or None if the type is unsupported."""
+    return IMPORT_READERS.get(os.path.splitext(filename)[1].lower())
+
+
+def import_rows(path):
+    """Yield the rows of the import file at ``path``."""
+    iter_rows = import_reader(path)
+    with open(path, 'rb') as f:
+        yield from iter_rows(f)
+
+
+@contextmanager
+def local_csv_path(field_file):
+    """
+    Path of a local CSV copy of an uploaded import file, for as long as the block runs.
+
+    An .xlsx is converted once here, so validation and the import that
+    follows both read a CSV instead of parsing the sheet XML twice. A .csv
+    on the filesystem storage is used in place; one on remote storage is
+    downloaded.
+    """
+    is_xlsx = os.path.splitext(field_file.name)[1].lower() == '.xlsx'
+    if not is_xlsx:
+        try:
+            path = field_file.path
+        except NotImplementedError:
+            pass
+        else:
+            yield path
+            return
+    with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as spool:
+        path = spool.name
+        try:
+            with field_file.open('rb') as f:
+                if is_xlsx:
+                    text = io.TextIOWrapper(spool, encoding='utf-8', newline='')
+                    csv.writer(text).writerows(iter_xlsx_table(f))
+                    text.detach()
+                else:
+                    shutil.copyfileobj(f, spool)
+        except BaseException:
+            os.unlink(path)
+            raise
+    try:
+        yield path
+    finally:
+        os.unlink(path)
@@ -0,0 +1,104 @@
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+
+# SQLite FTS5 table mirroring the searchable Student columns (rowid = student
+# id). The unicode61 tokenizer folds case and accents, so "helene" matches
+# "Hélène". Created by migration 0014 on SQLite only; kept in sync by the
+# Student signals and by index_students() for bulk writes.
+FTS_TABLE = 'certifications_student_fts'
+FTS_COLUMNS = ['noms_et_prenoms', 'matricule', 'numero', 'filiere']
+
+# PostgreSQL: the searchable columns as one accent- and case-folded string,
+# indexed with a pg_trgm GIN index by migration 0020. Queries must use this
+# exact expression for the index to apply.
+SEARCH_TEXT_SQL = (
+    "certifications_search_text(COALESCE(noms_et_prenoms, '') || ' ' || COALESCE(matricule, '') || ' ' "
+    "|| COALESCE(numero, '') || ' ' || COALESCE(filiere, ''))"
+)
+
+SEARCH_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def trigram_search_enabled():
+    return connection.vendor == 'postgresql'
+
+
+def search_tokens(query):
+    return SEARCH_TOKEN_RE.findall(query or '')
+
+
+def search_students(queryset, query):
+    """
+    Narrow a Student queryset to rows matching every word of ``query``.
+
+    Each word is a prefix match on name, matricule, numero or filiere. On SQLite this
+    is an FTS5 index lookup; on PostgreSQL an accent-insensitive substring match
+    served by a trigram index. Other backends fall back to ``icontains``.
+    """
+    tokens = search_tokens(query)
+    if not tokens:
+        return queryset
+    if fts_enabled():
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]
+        ))
+    if trigram_search_enabled():
+        for token in tokens:
+            # \w+ tokens may hold '_', a LIKE wildcard.
+            pattern = '%' + token.replace('_', '\\_') + '%'
+            queryset = queryset.filter(RawSQL(
+                f'{SEARCH_TEXT_SQL} LIKE certifications_search_text(%s)', [pattern], output_field=BooleanField(),
+            ))
+        return queryset
+    for token in tokens:
+        queryset = queryset.filter(
+            Q(noms_et_prenoms__icontains=token) | Q(matricule__istartswith=token)
+            | Q(numero__istartswith=token) | Q(filiere__icontains=token)
+        )
+    return queryset
+
+
+def index_students(students):
+    """Insert or refresh the FTS rows of ``students`` (after bulk writes)."""
+    if not fts_enabled():
+        return
+    rows = [
+        [student.id] + [getattr(student, column) or '' for column in FTS_COLUMNS]
+        for student in students
+    ]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [[row[0]] for row in rows])
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) "
+            f"VALUES ({', '.join(['%s'] * (len(FTS_COLUMNS) + 1))})",
+            rows,
+        )
+
+
+def unindex_students(student_ids):
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [[student_id] for student_id in student_ids])
+
+
+def rebuild_search_index():
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) "
+            f"SELECT id, COALESCE(noms_et_prenoms, ''), COALESCE(matricule, ''), COALESCE(numero, ''), COALESCE(filiere, '') "
+            f"FROM certifications_student"
+        )
@@ -0,0 +1,36 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from certifications.models import CertificateTemplate, Issuer, QRCodeCustomization, Student
+from certifications.pdf import clear_template_layer_cache
+from certifications.qr import clear_qr_style_cache
+from certifications.search import index_students, unindex_students
+from certifications.verification import invalidate_issuer_counts, invalidate_student_pages
+
+@receiver([post_save, post_delete], sender=QRCodeCustomization)
+def invalidate_qr_style_cache(sender, **kwargs):
+    clear_qr_style_cache()
+
+@receiver([post_save, post_delete], sender=CertificateTemplate)
+def invalidate_template_layer_cache(sender, instance, **kwargs):
+    clear_template_layer_cache(instance.id)
+
+@receiver([post_save, post_delete], sender=Student)
+def invalidate_student_cache(sender, instance, **kwargs):
+    invalidate_student_pages([instance.id])
+    invalidate_issuer_counts([instance.issuer_id])
+
+@receiver(post_save, sender=Student)
+def index_student(sender, instance, **kwargs):
+    index_students([instance])
+
+@receiver(post_delete, sender=Student)
+def unindex_student(sender, instance, **kwargs):
+    unindex_students([instance.id])
+
+@receiver(post_save, sender=Issuer)
+def invalidate_issuer_students_cache(sender, instance, **kwargs):
+    # The pages show the issuer's name, so its students get a new version.
+    # Deleting an issuer cascades to its students, whose own post_delete fires.
+    instance.student_set.update(updated_at=timezone.now())
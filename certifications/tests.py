@@ -0,0 +1,657 @@
+import datetime
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from collections import Counter
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import Workbook, load_workbook
+from PIL import Image
+
+from certifications import exports
+from certifications.bulk import bulk_delete_students, bulk_update_students
+from certifications.importers import CopyStudentImporter, StudentImporter, student_importer
+from certifications.jobs import UPLOAD_STALE_AFTER, claim_next_upload, process_upload
+from certifications.models import CSVUpload, Issuer, Student
+from certifications.pagination import KeysetPaginator
+from certifications.pdf import get_certificate_pdf
+from certifications.qr import (
+    QR_CODE_DIR, QR_MAX_SIZE, QR_MIN_SIZE, clear_qr_style_cache, ensure_qr_codes, generate_qr_code, generate_qr_codes,
+    qr_link_path, qr_payload, render_qr_png,
+)
+from certifications.readers import ENCODING_SAMPLE_SIZE, iter_csv_rows
+from certifications.search import FTS_TABLE, index_students, search_students
+from certifications.validation import validate_import_file
+from certifications.verification import get_students_data, page_cache_key
+
+
+class CountingStorage:
+    """Proxy for default_storage that counts calls per storage method."""
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.calls = Counter()
+
+    def __getattr__(self, name):
+        attr = getattr(self.storage, name)
+        if not callable(attr):
+            return attr
+
+        def counted(*args, **kwargs):
+            self.calls[name] += 1
+            return attr(*args, **kwargs)
+
+        return counted
+
+
+class MediaTestCase(TestCase):
+    """TestCase writing media files to a throwaway MEDIA_ROOT."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        clear_qr_style_cache()
+        self.addCleanup(clear_qr_style_cache)
+
+
+class QRExportTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        issuer = Issuer.objects.create(name_en='Export University')
+        students = [
+            Student.objects.create(
+                noms_et_prenoms=f'Student {i}', matricule=f'EXP-{i}', numero=f'EXP-N-{i}', issuer=issuer,
+            )
+            for i in range(5)
+        ]
+        for student_id, link in generate_qr_codes([student.id for student in students]).items():
+            Student.objects.filter(id=student_id).update(qr_code_link=link)
+
+    def test_export_queries_and_storage_calls_do_not_grow_with_students(self):
+        storage = CountingStorage(default_storage)
+        # One query for the CSV rows (joined to issuers), one for the image links.
+        with mock.patch.object(exports, 'default_storage', storage), self.assertNumQueries(2):
+            archive = b''.join(exports.stream_qr_export(Student.objects.order_by('id')))
+        self.assertEqual(storage.calls['exists'], 0)
+        self.assertEqual(storage.calls['listdir'], 1)
+        names = zipfile.ZipFile(io.BytesIO(archive)).namelist()
+        self.assertEqual(len([name for name in names if name.startswith('qr_codes/')]), 5)
+
+
+@override_settings(QR_ON_DEMAND=True)
+class OnDemandQRExportTests(MediaTestCase):
+    def test_export_includes_images_behind_endpoint_links(self):
+        issuer = Issuer.objects.create(name_en='On Demand University')
+        student_ids = [
+            Student.objects.create(noms_et_prenoms=f'Student {i}', matricule=f'OD-{i}', issuer=issuer).id
+            for i in range(3)
+        ]
+        for student_id, link in generate_qr_codes(student_ids).items():
+            self.assertIsNone(qr_link_path(link))
+            Student.objects.filter(id=student_id).update(qr_code_link=link)
+
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(exports.stream_qr_export(Student.objects.order_by('id')))))
+
+        for student_id in student_ids:
+            image = Image.open(io.BytesIO(archive.read(f'qr_codes/student_{student_id}.png')))
+            self.assertEqual(image.format, 'PNG')
+
+
+class StudentDeletionTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.issuer = Issuer.objects.create(name_en='Deletion University')
+
+    def create_student(self, index, session='2024'):
+        student = Student.objects.create(
+            noms_et_prenoms=f'Student {index}', matricule=f'DEL-{index}', numero=f'DEL-N-{index}',
+            session=session, issuer=self.issuer,
+        )
+        student.qr_code_link = generate_qr_code(student.id)
+        student.save()
+        return student
+
+    def test_delete_student_removes_qr_code_and_certificates(self):
+        student = self.create_student(1)
+        certificate = get_certificate_pdf(student)
+        qr_path = qr_link_path(student.qr_code_link)
+
+        response = self.client.post(reverse('certifications:delete_student', args=[student.id]), secure=True)
+        self.assertRedirects(response, reverse('certifications:index'), fetch_redirect_response=False)
+
+        self.assertFalse(default_storage.exists(qr_path))
+        self.assertFalse(default_storage.exists(certificate))
+        self.assertFalse(default_storage.exists(os.path.dirname(certificate)))
+
+    def test_bulk_delete_sweeps_files_of_deleted_students_only(self):
+        deleted = [self.create_student(i) for i in range(3)]
+        kept = self.create_student(3, session='2025')
+        files = {student.id: (get_certificate_pdf(student), qr_link_path(student.qr_code_link))
+                 for student in deleted + [kept]}
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(bulk_delete_students(Student.objects.filter(session='2024')), 3)
+
+        self.assertEqual(list(Student.objects.all()), [kept])
+        for student in deleted:
+            self.assertFalse(any(default_storage.exists(path) for path in files[student.id]))
+        self.assertTrue(all(default_storage.exists(path) for path in files[kept.id]))
+
+
+class QRImageEndpointTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        issuer = Issuer.objects.create(name_en='Endpoint University')
+        self.student = Student.objects.create(noms_et_prenoms='Student', matricule='QR-1', issuer=issuer)
+
+    def get_png(self, **params):
+        url = reverse('certifications:student_qr_image', args=[self.student.id, 'png'])
+        response = self.client.get(url, params, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return Image.open(io.BytesIO(response.content))
+
+    def test_explicit_size_is_honoured(self):
+        for size in (64, 330, 500):
+            self.assertEqual(self.get_png(size=size).size, (size, size))
+
+    def test_only_the_native_size_is_stored(self):
+        for size in (64, 330, 500):
+            self.get_png(size=size)
+        self.assertFalse(default_storage.exists(QR_CODE_DIR))
+        self.get_png()
+        _, files = default_storage.listdir(QR_CODE_DIR)
+        self.assertEqual(len(files), 1)
+
+    def test_size_is_clamped(self):
+        self.assertEqual(self.get_png(size=1).size, (QR_MIN_SIZE, QR_MIN_SIZE))
+        self.assertEqual(self.get_png(size=100000).size, (QR_MAX_SIZE, QR_MAX_SIZE))
+
+    def test_no_size_returns_native_rendering(self):
+        native = Image.open(io.BytesIO(render_qr_png(qr_payload(self.student.id), '#000000', '#FFFFFF')))
+        self.assertEqual(self.get_png().size, native.size)
+
+
+class RegenerateQRCodesTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        issuer = Issuer.objects.create(name_en='Regeneration University')
+        self.student_ids = [
+            Student.objects.create(noms_et_prenoms=f'Student {i}', matricule=f'RG-{i}', issuer=issuer).id
+            for i in range(5)
+        ]
+        self.checkpoint = os.path.join(settings.MEDIA_ROOT, 'checkpoint.json')
+
+    def regenerate(self):
+        call_command(
+            'regenerate_qr_codes', workers=1, batch_size=2, checkpoint=self.checkpoint, stdout=io.StringIO(),
+        )
+
+    def test_interrupted_run_resumes_after_the_finished_rows(self):
+        calls = []
+
+        def interrupt_second_batch(student_ids, **kwargs):
+            calls.append(student_ids)
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            return ensure_qr_codes(student_ids, **kwargs)
+
+        command = 'certifications.management.commands.regenerate_qr_codes.ensure_qr_codes'
+        with mock.patch(command, side_effect=interrupt_second_batch), self.assertRaises(KeyboardInterrupt):
+            self.regenerate()
+        self.assertTrue(os.path.exists(self.checkpoint))
+
+        with mock.patch(command, wraps=ensure_qr_codes) as resumed:
+            self.regenerate()
+        self.assertEqual([call.args[0] for call in resumed.call_args_list], [self.student_ids[2:4], self.student_ids[4:]])
+        self.assertFalse(os.path.exists(self.checkpoint))
+        links = dict(Student.objects.values_list('id', 'qr_code_link'))
+        self.assertEqual(links, generate_qr_codes(self.student_ids))
+
+    @override_settings(QR_ON_DEMAND=True)
+    def test_on_demand_keeps_endpoint_links_and_renders_nothing(self):
+        links = generate_qr_codes(self.student_ids)
+        for student_id, link in links.items():
+            Student.objects.filter(id=student_id).update(qr_code_link=link)
+        self.regenerate()
+        self.assertEqual(dict(Student.objects.values_list('id', 'qr_code_link')), links)
+        self.assertFalse(default_storage.exists(QR_CODE_DIR))
+
+class BenchmarkImportTests(MediaTestCase):
+    def test_with_qr_deletes_the_images_it_stored(self):
+        issuer = Issuer.objects.create(name_en='Benchmark Host University')
+        student = Student.objects.create(noms_et_prenoms='Kept Student', matricule='KEEP-1', issuer=issuer)
+        kept = generate_qr_code(student.id)
+        Student.objects.filter(id=student.id).update(qr_code_link=kept)
+
+        call_command('benchmark_import', rows=5, issuers=1, with_qr=True, stdout=io.StringIO())
+
+        self.assertEqual(list(Student.objects.values_list('id', flat=True)), [student.id])
+        self.assertEqual(default_storage.listdir(QR_CODE_DIR)[1], [os.path.basename(qr_link_path(kept))])
+
+class KeysetPaginatorTests(TestCase):
+    def setUp(self):
+        self.issuer = Issuer.objects.create(name_en='Paging University')
+        births = [
+            None, datetime.date(2001, 5, 1), None, datetime.date(1999, 1, 1), datetime.date(2001, 5, 1),
+            None, datetime.date(2003, 2, 2),
+        ]
+        for i, birth in enumerate(births):
+            Student.objects.create(
+                noms_et_prenoms=f'Student {i}', matricule=f'PG-{i}', date_de_naissance=birth, issuer=self.issuer,
+            )
+        self.paginator = KeysetPaginator(Student.objects.all(), 2, field='date_de_naissance')
+        self.expected = [student.id for student in self.paginator.ordered(descending=True)]
+
+    def ids(self, page):
+        return [student.id for student in page]
+
+    def test_forward_and_back_round_trip_across_nulls(self):
+        pages = [self.paginator.page()]
+        while pages[-1].has_next():
+            pages.append(self.paginator.page(after=pages[-1].next_cursor))
+        self.assertEqual([student_id for page in pages for student_id in self.ids(page)], self.expected)
+        self.assertFalse(pages[0].has_previous())
+        self.assertEqual(len(pages), 4)
+
+        back = [pages[-1]]
+        while back[-1].has_previous():
+            back.append(self.paginator.page(before=back[-1].previous_cursor))
+        self.assertEqual([self.ids(page) for page in reversed(back)], [self.ids(page) for page in pages])
+
+    def test_malformed_cursors_fall_back_to_the_first_page(self):
+        first = self.ids(self.paginator.page())
+        for cursor in ['', 'garbage', '_', 'abc_def', '2001-13-45_3', '2001-05-01_x', '2001-05-01']:
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.ids(self.paginator.page(after=cursor)), first)
+                self.assertEqual(self.ids(self.paginator.page(before=cursor)), first)
+
+    def test_views_answer_tampered_cursors_with_the_first_page(self):
+        urls = [reverse('certifications:verify_issuer', args=[self.issuer.uuid]), reverse('certifications:index')]
+        for url in urls:
+            for cursor in ['garbage', '2024-01-01T00:00:00_x', '9' * 30, '2024-01-01_' + '9' * 30]:
+                with self.subTest(url=url, cursor=cursor):
+                    for param in ('after', 'before'):
+                        self.assertEqual(self.client.get(url, {param: cursor}, secure=True).status_code, 200)
+
+class VerificationPageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.issuer = Issuer.objects.create(name_en='Verification University')
+        self.student = Student.objects.create(noms_et_prenoms='Awa Diop', matricule='VP-1', issuer=self.issuer)
+        self.url = reverse('certifications:verify', args=[self.student.id])
+
+    def get(self, **headers):
+        return self.client.get(self.url, secure=True, **headers)
+
+    def test_repeat_scan_gets_304_from_one_primary_key_lookup(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(1):
+            response = self.get(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_page_is_rendered_once_per_version(self):
+        first = self.get()
+        with self.assertNumQueries(1):
+            second = self.get()
+        self.assertEqual((second.status_code, second.content), (200, first.content))
+
+    def test_write_from_another_process_is_seen(self):
+        etag = self.get()['ETag']
+        # A queryset update sends no signal: like a write made by another
+        # process, it does not touch this process's cache.
+        Student.objects.filter(id=self.student.id).update(noms_et_prenoms='Fatou Sy', updated_at=timezone.now())
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'Fatou Sy')
+
+    def test_save_drops_the_cached_page(self):
+        etag = self.get()['ETag']
+        self.student.noms_et_prenoms = 'Fatou Sy'
+        self.student.save()
+        self.assertIsNone(cache.get(page_cache_key('student_verification.html', self.student.id)))
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Fatou Sy')
+
+    def test_issuer_rename_and_bulk_update_change_the_page(self):
+        etag = self.get()['ETag']
+        self.issuer.name_en = 'Renamed University'
+        self.issuer.save()
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Renamed University')
+
+        other = Issuer.objects.create(name_en='Other University')
+        bulk_update_students(Student.objects.filter(id=self.student.id), issuer=other)
+        response = self.get(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertContains(response, 'Other University')
+
+    def test_deleted_student_is_gone(self):
+        self.get()
+        self.student.delete()
+        self.assertEqual(self.get().status_code, 404)
+
+    def test_api_data_follows_the_row(self):
+        self.assertEqual(get_students_data([self.student.id])[self.student.id]['noms_et_prenoms'], 'Awa Diop')
+        Student.objects.filter(id=self.student.id).update(noms_et_prenoms='Fatou Sy', updated_at=timezone.now())
+        self.assertEqual(get_students_data([self.student.id])[self.student.id]['noms_et_prenoms'], 'Fatou Sy')
+        self.assertEqual(get_students_data([self.student.id + 1000]), {})
+
+class ImportEncodingTests(TestCase):
+    def read_names(self, data):
+        return [row['noms_et_prenoms'] for row in iter_csv_rows(io.BytesIO(data))]
+
+    def test_cp1252_after_the_sniffed_sample(self):
+        ascii_rows = ''.join(f'Student {i}\n' for i in range(ENCODING_SAMPLE_SIZE // 10)).encode()
+        data = b'noms_et_prenoms\n' + ascii_rows + 'Hélène Müller\n'.encode('cp1252')
+        self.assertGreater(len(data) - len('Hélène Müller\n'), ENCODING_SAMPLE_SIZE)
+        self.assertEqual(self.read_names(data)[-1], 'Hélène Müller')
+
+    def test_bytes_undefined_in_cp1252(self):
+        data = 'noms_et_prenoms\nHélène\n'.encode('cp1252') + b'A\x81B\n'
+        self.assertEqual(self.read_names(data), ['Hélène', 'A\x81B'])
+
+    def test_utf8_and_bom_encodings(self):
+        text = 'noms_et_prenoms\nHélène\n'
+        for encoding in ('utf-8', 'utf-8-sig', 'utf-16'):
+            self.assertEqual(self.read_names(text.encode(encoding)), ['Hélène'], encoding)
+
+
+class ProcessUploadTests(MediaTestCase):
+    COLUMNS = 'noms_et_prenoms,matricule,filiere,mention,session,sexe,date_de_naissance,numero,issuer_name_en\n'
+
+    def process(self, data, name='students.csv', **fields):
+        upload = CSVUpload.objects.create(file=ContentFile(data, name=name), status='processing', **fields)
+        return process_upload(upload)
+
+    def assertImported(self, upload, count):
+        self.assertEqual((upload.status, upload.successful_records, upload.error_log), ('done', count, ''))
+
+    def test_cp1252_and_utf16_uploads(self):
+        text = self.COLUMNS + (
+            'Hélène Dupré,ENC-1,Génie Civil,Très Bien,2024,F,2000-01-01,ENC-N-1,Université Française\n'
+            'Zoë Ångström,ENC-2,Génie Civil,Bien,2024,F,,ENC-N-2,Université Française\n'
+        )
+        for index, encoding in enumerate(['cp1252', 'utf-16']):
+            with self.subTest(encoding=encoding):
+                data = text.replace('ENC-', f'ENC{index}-').encode(encoding)
+                self.assertImported(self.process(data), 2)
+                self.assertEqual(
+                    Student.objects.get(matricule=f'ENC{index}-1').noms_et_prenoms, 'Hélène Dupré',
+                )
+
+    def xlsx(self, *rows):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(self.COLUMNS.strip().split(','))
+        for row in rows:
+            sheet.append(row)
+        data = io.BytesIO()
+        workbook.save(data)
+        return data.getvalue()
+
+    def test_xlsx_upload_is_parsed_once(self):
+        data = self.xlsx(
+            ['Hélène Dupré', 1001, 'Génie Civil', 'Très Bien', '2024', 'F', '2000-01-01', 'XL-N-1', 'Université'],
+            [],
+            ['Zoë Ångström', 'XL-2', 'Génie Civil', 'Bien', '2024', 'F'],
+        )
+        with mock.patch('certifications.readers.load_workbook', wraps=load_workbook) as load:
+            upload = self.process(data, name='students.xlsx')
+        self.assertImported(upload, 2)
+        self.assertEqual(load.call_count, 1)
+        self.assertEqual(Student.objects.get(matricule='1001').noms_et_prenoms, 'Hélène Dupré')
+        self.assertIsNone(Student.objects.get(matricule='XL-2').numero)
+
+    def test_xlsx_validation_errors(self):
+        data = self.xlsx(
+            ['Hélène Dupré', 'XL-1', 'Génie Civil', 'Très Bien', '2024', 'X'],
+            ['Zoë Ångström', 'XL-1', 'Génie Civil', 'Bien', '2024', 'F'],
+        )
+        upload = self.process(data, name='students.xlsx')
+        self.assertEqual(upload.status, 'failed')
+        self.assertIn('Error in row 1: sexe', upload.error_log)
+        self.assertIn('Error in row 2: matricule', upload.error_log)
+        self.assertFalse(Student.objects.exists())
+
+
+    def test_blank_and_missing_numeros_pass_both_layers(self):
+        files = {
+            'no numero column': (
+                'noms_et_prenoms,matricule,filiere,mention,issuer_name_en\n'
+                'Awa Diop,NN-1,Informatique,Bien,Université\n'
+                'Moussa Ba,NN-2,Informatique,Bien,Université\n'
+                'Fatou Sy,NN-3,Informatique,Bien,Université\n'
+            ),
+            'blank numeros': (
+                self.COLUMNS
+                + 'Awa Diop,BN-1,Informatique,Bien,2024,F,,,Université\n'
+                'Moussa Ba,BN-2,Informatique,Bien,2024,M,,,Université\n'
+                'Fatou Sy,BN-3,Informatique,Bien,2024,F,,BN-N-3,Université\n'
+            ),
+        }
+        for label, text in files.items():
+            with self.subTest(label):
+                data = text.encode()
+                self.assertEqual(validate_import_file(io.BytesIO(data))[1].empty, True)
+                self.assertImported(self.process(data), 3)
+        self.assertEqual(Student.objects.filter(numero__isnull=True).count(), 5)
+
+    def test_duplicate_numeros_fail_both_layers(self):
+        data = (self.COLUMNS + (
+            'Awa Diop,DN-1,Informatique,Bien,2024,F,,DN-N,Université\n'
+            'Moussa Ba,DN-2,Informatique,Bien,2024,M,,DN-N,Université\n'
+        )).encode()
+        _, errors = validate_import_file(io.BytesIO(data))
+        self.assertEqual(list(errors[['row', 'column']].itertuples(index=False, name=None)), [(2, 'numero')])
+        result = StudentImporter(generate_qr=False).run(iter_csv_rows(io.BytesIO(data)))
+        self.assertEqual((result.success_count, result.error_count), (1, 1))
+
+
+class ClaimUploadTests(TestCase):
+    def upload(self, status='pending', **fields):
+        return CSVUpload.objects.create(file='uploads/csv/students.csv', status=status, **fields)
+
+    def test_two_claimers_get_different_uploads(self):
+        first, second = self.upload(), self.upload()
+        real_first = QuerySet.first
+        racing = []
+
+        def first_then_race(queryset):
+            # Another worker claims between this worker's SELECT and its UPDATE.
+            candidate = real_first(queryset)
+            if queryset.model is CSVUpload and not racing:
+                racing.append(None)
+                racing[0] = claim_next_upload()
+            return candidate
+
+        with mock.patch.object(QuerySet, 'first', first_then_race):
+            claimed = claim_next_upload()
+        self.assertEqual((racing[0], claimed), (first, second))
+        self.assertIsNone(claim_next_upload())
+
+    def test_stale_processing_upload_is_reclaimed(self):
+        upload = self.upload('processing', successful_records=40)
+        CSVUpload.objects.filter(pk=upload.pk).update(updated_at=timezone.now() - UPLOAD_STALE_AFTER * 2)
+        claimed = claim_next_upload()
+        self.assertEqual(claimed, upload)
+        self.assertEqual((claimed.status, claimed.successful_records), ('processing', 0))
+        self.assertGreater(claimed.updated_at, timezone.now() - UPLOAD_STALE_AFTER)
+
+    def test_fresh_processing_upload_is_left_to_its_worker(self):
+        self.upload('processing')
+        self.assertIsNone(claim_next_upload())
+
+class UpsertImportTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.issuer = Issuer.objects.create(name_en='Upsert University')
+        self.student = Student.objects.create(
+            noms_et_prenoms='Awa Diop', matricule='UP-1', filiere='Informatique', mention='Bien', session='2024',
+            sexe='F', date_de_naissance=datetime.date(2000, 1, 1), lieu_de_naissance='Dakar', numero='UP-N-1',
+            issuer=self.issuer,
+        )
+
+    def upsert(self, *rows):
+        return StudentImporter(generate_qr=False, update_existing=True).run(rows)
+
+    def row(self, **values):
+        return {
+            'noms_et_prenoms': 'Awa Diop', 'matricule': 'UP-1', 'filiere': 'Informatique', 'mention': 'Bien',
+            'issuer_name_en': 'Upsert University', **values,
+        }
+
+    def test_only_changed_fields_are_written(self):
+        result = self.upsert(self.row(mention='Très Bien', session='2024', numero='UP-N-1'))
+        self.assertEqual((result.update_count, result.skip_count, result.error_count), (1, 0, 0))
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.mention, 'Très Bien')
+        self.assertEqual(self.student.numero, 'UP-N-1')
+
+    def test_columns_missing_from_the_file_are_kept(self):
+        result = self.upsert(self.row(noms_et_prenoms='Awa Diop Ndiaye', numero='UP-N-1'))
+        self.assertEqual(result.update_count, 1)
+        self.student.refresh_from_db()
+        self.assertEqual(
+            (self.student.noms_et_prenoms, self.student.session, self.student.sexe,
+             self.student.lieu_de_naissance, self.student.date_de_naissance),
+            ('Awa Diop Ndiaye', '2024', 'F', 'Dakar', datetime.date(2000, 1, 1)),
+        )
+
+    def test_created_updated_and_unchanged_counts(self):
+        Student.objects.create(
+            noms_et_prenoms='Moussa Ba', matricule='UP-2', filiere='Informatique', mention='Bien', issuer=self.issuer,
+        )
+        result = self.upsert(
+            self.row(mention='Passable'),
+            self.row(noms_et_prenoms='Moussa Ba', matricule='UP-2'),
+            self.row(noms_et_prenoms='Fatou Sy', matricule='UP-3'),
+        )
+        self.assertEqual(
+            (result.success_count, result.update_count, result.skip_count, result.error_count), (1, 1, 1, 0),
+        )
+        self.assertTrue(Student.objects.filter(matricule='UP-3').exists())
+
+    def test_numero_ownership(self):
+        Student.objects.create(
+            noms_et_prenoms='Moussa Ba', matricule='UP-2', filiere='Informatique', mention='Bien', numero='UP-N-2',
+            issuer=self.issuer,
+        )
+        result = self.upsert(
+            # Keeping its own numero is not a conflict.
+            self.row(numero='UP-N-1', mention='Très Bien'),
+            # Taking another student's numero is.
+            self.row(noms_et_prenoms='Moussa Ba', matricule='UP-2', numero='UP-N-1'),
+            # So is a numero claimed by an earlier row of the file.
+            self.row(noms_et_prenoms='Fatou Sy', matricule='UP-3', numero='UP-N-1'),
+            self.row(noms_et_prenoms='Ali Kane', matricule='UP-4', numero='UP-N-4'),
+        )
+        self.assertEqual((result.success_count, result.update_count, result.error_count), (1, 1, 2))
+        self.assertEqual(result.error_messages, [
+            'Error in row 2: Un étudiant avec le numéro UP-N-1 existe déjà.',
+            'Error in row 3: Un étudiant avec le numéro UP-N-1 existe déjà.',
+        ])
+        self.assertEqual(Student.objects.get(matricule='UP-2').numero, 'UP-N-2')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'COPY imports run on PostgreSQL only.')
+class CopyStudentImporterTests(MediaTestCase):
+    def row(self, matricule, numero):
+        return {
+            'noms_et_prenoms': f'Student {matricule}', 'matricule': matricule, 'filiere': 'Informatique',
+            'mention': 'Bien', 'session': '2024', 'numero': numero, 'issuer_name_en': 'Copy University',
+        }
+
+    def test_insert_skip_and_numero_conflict(self):
+        issuer = Issuer.objects.create(name_en='Copy University')
+        Student.objects.create(
+            noms_et_prenoms='Existing', matricule='PG-1', numero='PG-N-1', filiere='Informatique',
+            mention='Bien', issuer=issuer,
+        )
+        importer = student_importer(generate_qr=False)
+        self.assertIsInstance(importer, CopyStudentImporter)
+
+        result = importer.run([
+            self.row('PG-1', 'PG-N-9'),
+            self.row('PG-2', 'PG-N-2'),
+            self.row('PG-3', 'PG-N-1'),
+        ])
+
+        self.assertEqual((result.success_count, result.skip_count, result.error_count), (1, 1, 1))
+        self.assertEqual(result.error_messages, ['Error in row 3: Un étudiant avec le numéro PG-N-1 existe déjà.'])
+        self.assertEqual(Student.objects.get(matricule='PG-1').numero, 'PG-N-1')
+        self.assertEqual(Student.objects.get(matricule='PG-2').issuer, issuer)
+        self.assertFalse(Student.objects.filter(matricule='PG-3').exists())
+
+
+@skipUnless(connection.vendor == 'sqlite', 'The FTS5 search index exists on SQLite only.')
+class FTSSearchTests(TestCase):
+    def setUp(self):
+        self.issuer = Issuer.objects.create(name_en='Search University')
+
+    def create(self, name, matricule, **fields):
+        return Student.objects.create(noms_et_prenoms=name, matricule=matricule, issuer=self.issuer, **fields)
+
+    def search(self, query):
+        return list(search_students(Student.objects.order_by('id'), query))
+
+    def indexed_ids(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT rowid FROM {FTS_TABLE} ORDER BY rowid')
+            return [row[0] for row in cursor.fetchall()]
+
+    def test_accent_folded_prefix_matches(self):
+        helene = self.create('Hélène Dupré', 'FT-2024-1', filiere='Génie Civil')
+        self.create('Henri Martin', 'FT-2024-2', filiere='Informatique')
+        self.assertEqual(self.search('helene'), [helene])
+        self.assertEqual(self.search('HEL dup'), [helene])
+        self.assertEqual(self.search('genie'), [helene])
+        self.assertEqual(self.search('FT 2024'), self.search('ft'))
+        self.assertEqual(self.search('helene martin'), [])
+
+    def test_signals_keep_the_index_in_sync(self):
+        student = self.create('Hélène Dupré', 'FT-1')
+        student.noms_et_prenoms = 'Awa Diop'
+        student.save()
+        self.assertEqual(self.search('helene'), [])
+        self.assertEqual(self.search('awa'), [student])
+        student.delete()
+        self.assertEqual(self.indexed_ids(), [])
+
+    def test_index_students_after_bulk_create(self):
+        students = Student.objects.bulk_create([
+            Student(noms_et_prenoms=f'Élève {i}', matricule=f'BK-{i}', issuer=self.issuer) for i in range(3)
+        ])
+        self.assertEqual(self.search('eleve'), [])
+        index_students(students)
+        self.assertEqual(self.search('eleve'), students)
+        self.assertEqual(self.indexed_ids(), [student.id for student in students])
+
+@skipUnless(connection.vendor == 'postgresql', 'The trigram search index exists on PostgreSQL only.')
+class TrigramSearchTests(MediaTestCase):
+    def test_search_folds_accents_and_case_across_columns(self):
+        issuer = Issuer.objects.create(name_en='Search University')
+        student = Student.objects.create(
+            noms_et_prenoms='Hélène Dupré', matricule='SR-2024-7', filiere='Génie Civil', mention='Bien', issuer=issuer,
+        )
+        Student.objects.create(noms_et_prenoms='Other Student', matricule='SR-2024-8', issuer=issuer)
+        students = Student.objects.all()
+        self.assertEqual(list(search_students(students, 'HELENE genie')), [student])
+        self.assertEqual(list(search_students(students, 'dupre 2024-7')), [student])
+        self.assertEqual(list(search_students(students, 'helene other')), [])
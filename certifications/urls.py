@@ -8,6 +8,9 @@ urlpatterns = [
     path('index/', views.index, name='index'),
     path('verify/<int:student_id>/', views.verify, name='verify'),
     path('upload-csv/', views.upload_csv, name='upload_csv'),
+    path('upload-csv/<int:upload_id>/', views.csv_upload_status, name='csv_upload_status'),
+    path('upload-csv/<int:upload_id>/progress/', views.csv_upload_progress, name='csv_upload_progress'),
+    path('upload-csv/<int:upload_id>/errors.csv', views.csv_upload_report, name='csv_upload_report'),
     path('download-sample-csv/', views.download_sample_csv, name='download_sample_csv'),
     # path('generate-qr-codes/', views.generate_qr_codes, name='generate_qr_codes'),
     path('download-qr-codes/', views.download_qr_codes, name='download_qr_codes'),
@@ -17,9 +20,15 @@ urlpatterns = [
     path('templates/delete/<int:template_id>/', views.delete_template, name='delete_template'),
     path('student/edit/<int:student_id>/', views.edit_student, name='edit_student'),
     path('student/delete/<int:student_id>/', views.delete_student, name='delete_student'),
+    path('students/bulk/', views.bulk_students, name='bulk_students'),
+    path('student/<int:student_id>/certificate.pdf', views.certificate_pdf, name='certificate_pdf'),
     path('issuers/', views.list_issuers, name='list_issuers'),
     path('issuers/create/', views.create_issuer, name='create_issuer'),
     path('issuers/edit/<int:issuer_id>/', views.edit_issuer, name='edit_issuer'),
     path('verify-issuer/<uuid:uuid>/', views.verify_issuer, name='verify_issuer'),
     path('student-qr-info/<int:student_id>/', views.student_qr_info, name='student_qr_info'),
+    path('student/<int:student_id>/qr.<str:fmt>', views.student_qr_image, name='student_qr_image'),
+    path('api/students/', views.api_students, name='api_students'),
+    path('api/students/search/', views.api_search_students, name='api_search_students'),
+    path('api/students/<int:student_id>/', views.api_student, name='api_student'),
 ]
@@ -0,0 +1,100 @@
+import pandas as pd
+from django.core.exceptions import FieldDoesNotExist
+
+from certifications.models import Student
+from certifications.readers import open_text
+
+# Columns StudentImporter.build_student() reads without a default.
+REQUIRED_COLUMNS = ['noms_et_prenoms', 'matricule', 'filiere', 'mention', 'issuer_name_en']
+# Columns that must not repeat within one file. Blank values are imported as
+# NULL, which never conflicts, so they may repeat (as in StudentImporter).
+# Student's unique_together includes matricule, so it needs no check of its own.
+UNIQUE_COLUMNS = ['matricule', 'numero']
+# Rows loaded into one DataFrame. Uniqueness is tracked across chunks, so the
+# file never has to fit in memory at once.
+VALIDATION_CHUNK_SIZE = 50000
+ERROR_REPORT_COLUMNS = ['row', 'column', 'value', 'error']
+
+
+def read_frames(binary_file):
+    """Yield a CSV import file as DataFrames of string columns, VALIDATION_CHUNK_SIZE rows each."""
+    # Decoded by open_text(), like the import itself: pandas would ignore
+    # ``encoding`` for a storage File it does not recognise as binary.
+    yield from pd.read_csv(
+        open_text(binary_file), dtype=str, keep_default_na=False, chunksize=VALIDATION_CHUNK_SIZE,
+    )
+
+
+def frame_errors(frame, column, mask, message):
+    bad = frame.loc[mask, column]
+    return pd.DataFrame({'row': bad.index, 'column': column, 'value': bad.values, 'error': message})
+
+
+def validate_frame(frame, seen):
+    """
+    Check one chunk column by column and return its errors as a DataFrame.
+
+    ``frame`` is indexed by file row number. ``seen`` maps each unique
+    column to the values of earlier chunks.
+    """
+    errors = []
+    if 'sexe' in frame:
+        errors.append(frame_errors(
+            frame, 'sexe', ~frame['sexe'].isin(['', 'M', 'F']), 'Must be M or F.',
+        ))
+    if 'date_de_naissance' in frame:
+        dates = frame['date_de_naissance']
+        parsed = pd.to_datetime(dates, format='%Y-%m-%d', errors='coerce')
+        errors.append(frame_errors(
+            frame, 'date_de_naissance', (dates != '') & parsed.isna(), 'Invalid date, expected YYYY-MM-DD.',
+        ))
+    for column in frame.columns:
+        try:
+            max_length = Student._meta.get_field(column).max_length
+        except FieldDoesNotExist:
+            continue
+        if max_length:
+            errors.append(frame_errors(
+                frame, column, frame[column].str.len() > max_length, f'Longer than {max_length} characters.',
+            ))
+
+    for column in UNIQUE_COLUMNS:
+        if column not in frame:
+            continue
+        values = frame[column]
+        filled = values != ''
+        mask = filled & (values.duplicated() | values.isin(seen[column]))
+        errors.append(frame_errors(frame, column, mask, f'Duplicate {column} in this file.'))
+        seen[column].update(values[filled])
+
+    return pd.concat(errors, ignore_index=True)
+
+
+def validate_import_file(binary_file):
+    """
+    Pre-validate a CSV import file without touching the database.
+
+    Returns ``(row_count, errors)`` where ``errors`` is a DataFrame with
+    ERROR_REPORT_COLUMNS sorted by row, empty when the file can be imported.
+    Row numbers match the importer's (1 is the first data row).
+    """
+    seen = {column: set() for column in UNIQUE_COLUMNS}
+    errors = [pd.DataFrame(columns=ERROR_REPORT_COLUMNS)]
+    row_count = 0
+    for frame in read_frames(binary_file):
+        if not row_count:
+            missing = [column for column in REQUIRED_COLUMNS if column not in frame.columns]
+            if missing:
+                return 0, pd.DataFrame(
+                    [['', column, '', 'Missing column.'] for column in missing], columns=ERROR_REPORT_COLUMNS,
+                )
+        frame = frame.fillna('')
+        frame.index = pd.RangeIndex(row_count + 1, row_count + len(frame) + 1)
+        errors.append(validate_frame(frame, seen))
+        row_count += len(frame)
+    return row_count, pd.concat(errors, ignore_index=True).sort_values('row', kind='stable', ignore_index=True)
+
+
+def error_report_csv(errors):
+    """The errors DataFrame as CSV bytes, with a BOM so Excel picks up UTF-8."""
+    return errors.to_csv(index=False).encode('utf-8-sig')
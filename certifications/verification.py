@@ -0,0 +1,161 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from certifications.models import Student
+
+# Public pages rendered from a single student, keyed by template name.
+VERIFICATION_TEMPLATES = ['student_verification.html', 'student_qr_info.html']
+
+# Columns returned by the JSON verification API: the fields shown on
+# student_qr_info.html.
+VERIFICATION_API_FIELDS = [
+    'id', 'noms_et_prenoms', 'matricule', 'filiere', 'mention', 'session', 'sexe',
+    'date_de_naissance', 'lieu_de_naissance', 'numero', 'issuer__name_en', 'issue_date',
+]
+VERIFICATION_API_MAX_IDS = 500
+
+
+def page_cache_key(template_name, student_id):
+    return f'certifications:page:{template_name}:{student_id}'
+
+
+def data_cache_key(student_id):
+    return f'certifications:data:{student_id}'
+
+
+def invalidate_student_pages(student_ids):
+    """
+    Drop the cached pages and data of ``student_ids`` from this process's cache.
+
+    Only frees memory early: every cached entry carries the ``updated_at`` it
+    was built from and is discarded on read once the row has changed, which
+    also covers writes made by other processes.
+    """
+    keys = []
+    for student_id in student_ids:
+        keys.append(data_cache_key(student_id))
+        keys.extend(page_cache_key(template_name, student_id) for template_name in VERIFICATION_TEMPLATES)
+    cache.delete_many(keys)
+
+
+STUDENT_COUNT_CACHE_KEY = 'certifications:student-count'
+
+
+def issuer_count_cache_key(issuer_id):
+    return f'certifications:issuer-count:{issuer_id}'
+
+
+def get_student_count():
+    """Total number of students, cached so listing pages skip ``COUNT(*)``."""
+    count = cache.get(STUDENT_COUNT_CACHE_KEY)
+    if count is None:
+        count = Student.objects.count()
+        cache.set(STUDENT_COUNT_CACHE_KEY, count, settings.VERIFICATION_CACHE_TIMEOUT)
+    return count
+
+
+def get_issuer_student_count(issuer):
+    key = issuer_count_cache_key(issuer.id)
+    count = cache.get(key)
+    if count is None:
+        count = issuer.student_set.count()
+        cache.set(key, count, settings.VERIFICATION_CACHE_TIMEOUT)
+    return count
+
+
+def invalidate_issuer_counts(issuer_ids):
+    """Drop the cached per-issuer counts and the overall student count."""
+    cache.delete_many([STUDENT_COUNT_CACHE_KEY] + [issuer_count_cache_key(issuer_id) for issuer_id in issuer_ids])
+
+
+def serialize_student(row):
+    data = dict(row)
+    data['issuer'] = data.pop('issuer__name_en')
+    data['sexe_display'] = dict(Student.GENDER_CHOICES).get(data['sexe'], '')
+    return data
+
+
+def get_students_data(student_ids):
+    """
+    Return ``{student_id: data}`` for the students that exist.
+
+    The current ``updated_at`` of every student is read first (primary key
+    lookups only). Cached entries built from that version come from one
+    ``get_many``; the rest are loaded with a single ``values()`` query joined
+    to the issuer and written back with ``set_many``.
+    """
+    versions = dict(Student.objects.filter(id__in=student_ids).values_list('id', 'updated_at'))
+    keys = {data_cache_key(student_id): student_id for student_id in versions}
+    found = {
+        keys[key]: entry['data'] for key, entry in cache.get_many(keys).items()
+        if entry['version'] == versions[keys[key]]
+    }
+    missing = [student_id for student_id in versions if student_id not in found]
+    if missing:
+        entries = {}
+        for row in Student.objects.filter(id__in=missing).values(*VERIFICATION_API_FIELDS, 'updated_at'):
+            version = row.pop('updated_at')
+            entries[row['id']] = {'version': version, 'data': serialize_student(row)}
+        cache.set_many(
+            {data_cache_key(student_id): entry for student_id, entry in entries.items()},
+            settings.VERIFICATION_CACHE_TIMEOUT,
+        )
+        found.update((student_id, entry['data']) for student_id, entry in entries.items())
+    return found
+
+
+def conditional_json_response(request, payload):
+    """Compact JSON response with an ETag, answering 304 when it matches."""
+    content = json.dumps(payload, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':'))
+    etag = quote_etag(hashlib.md5(content.encode()).hexdigest())
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def page_etag(student_id, version):
+    return quote_etag(f'{student_id}-{int(version.timestamp() * 1000000)}')
+
+
+def cached_student_page(request, template_name, student_id):
+    """
+    Render ``template_name`` for one student through a read-through cache.
+
+    The page has no per-user content. Its ETag and Last-Modified come from the
+    student's ``updated_at``, read with one primary key lookup, so repeat scans
+    that send If-None-Match or If-Modified-Since get a 304 without rendering,
+    and a change made by any process is seen at once. The rendered HTML is
+    cached with the version it was built from and re-rendered when it is stale.
+    """
+    version = Student.objects.filter(id=student_id).values_list('updated_at', flat=True).first()
+    if version is None:
+        raise Http404('No Student matches the given query.')
+    response = get_conditional_response(
+        request, etag=page_etag(student_id, version), last_modified=int(version.timestamp()),
+    )
+    if response is None:
+        key = page_cache_key(template_name, student_id)
+        page = cache.get(key)
+        if page is None or page['version'] != version:
+            student = get_object_or_404(Student.objects.select_related('issuer'), id=student_id)
+            page = {'content': render_to_string(template_name, {'student': student}), 'version': student.updated_at}
+            cache.set(key, page, settings.VERIFICATION_CACHE_TIMEOUT)
+        version = page['version']
+        response = HttpResponse(page['content'])
+    response['ETag'] = page_etag(student_id, version)
+    response['Last-Modified'] = http_date(int(version.timestamp()))
+    # Let clients keep the page but revalidate it on every scan.
+    patch_cache_control(response, no_cache=True)
+    return response
@@ -1,38 +1,63 @@
-import io
 import csv
-import qrcode
-import zipfile
+import json
 import os
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponse, FileResponse
+from django.urls import reverse
+from django.http import Http404, HttpResponse, FileResponse, JsonResponse, StreamingHttpResponse
 from django.conf import settings
-from django.db import transaction, IntegrityError
+from django.db import IntegrityError
 from django.contrib import messages
-from django.core.files.base import ContentFile
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_http_methods
 from django.core.files.storage import default_storage
-from certifications.models import Student, QRCodeCustomization, Issuer, CertificateTemplate, CSVUpload, SampleCSV
-from certifications.forms import CertificateTemplateForm, IssuerForm, StudentForm, CSVUploadForm
-from PIL import Image
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from certifications.models import Student, Issuer, CertificateTemplate, CSVUpload
+from certifications.forms import (
+    BulkStudentActionForm, CertificateTemplateForm, IssuerForm, StudentForm, CSVUploadForm, ExportFilterForm,
+    StudentFilterForm,
+)
+from certifications.bulk import bulk_delete_students, bulk_update_students
+from certifications.exports import cache_export, cached_export_response, export_cache_path, export_digest, stream_qr_export
+from certifications.pagination import KeysetPaginator
+from certifications.pdf import delete_certificate_pdfs, get_certificate_pdf
+from certifications.qr import (
+    QR_FORMATS, QR_MAX_SIZE, QR_MIN_SIZE, generate_qr_code, get_qr_customization, get_qr_image,
+    qr_code_path, qr_link_path, qr_payload, qr_style_key,
+)
+from certifications.verification import (
+    VERIFICATION_API_MAX_IDS, cached_student_page, conditional_json_response, get_issuer_student_count,
+    get_student_count, get_students_data,
+)
+
+SEARCH_RESULTS_LIMIT = 20
 
 def home(request):
     return render(request, 'home.html')
 
 def index(request):
-    students_list = Student.objects.all().order_by('-id')  # Order by most recently added
-    paginator = Paginator(students_list, 10)  # Show 10 students per page
+    filter_form = StudentFilterForm(request.GET)
+    students_list = Student.objects.select_related('issuer')
+    if filter_form.is_valid():
+        students_list = filter_form.filter(students_list)
+    paginator = KeysetPaginator(students_list, 10)  # Most recently added first, 10 per page
+    students = paginator.page(after=request.GET.get('after'), before=request.GET.get('before'))
+
+    # Current filters, carried over by the pagination and export links.
+    filter_query = request.GET.copy()
+    for key in ('after', 'before'):
+        filter_query.pop(key, None)
 
-    page = request.GET.get('page')
-    try:
-        students = paginator.page(page)
-    except PageNotAnInteger:
-        # If page is not an integer, deliver first page.
-        students = paginator.page(1)
-    except EmptyPage:
-        # If page is out of range (e.g. 9999), deliver last page of results.
-        students = paginator.page(paginator.num_pages)
-
-    return render(request, 'index.html', {'students': students})
+    context = {
+        'students': students,
+        'student_count': get_student_count(),
+        'filter_form': filter_form,
+        'bulk_form': BulkStudentActionForm(),
+        'filter_query': filter_query.urlencode(),
+        'is_filtered': any(filter_query.values()),
+    }
+    return render(request, 'index.html', context)
 
 def download_sample_csv(request):
     # Create a new CSV file in memory
@@ -47,169 +72,152 @@ def download_sample_csv(request):
     
     return response
 
-def generate_qr_code(student_id):
-    """Generate a single QR code for a student"""
-    qr_customization = QRCodeCustomization.objects.first()
-    if not qr_customization:
-        qr_customization = QRCodeCustomization.objects.create()
-
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(f"{settings.BASE_URL}/certificate/student-qr-info/{student_id}/")
-    qr.make(fit=True)
-
-    qr_img = qr.make_image(fill_color=qr_customization.foreground_color, back_color=qr_customization.background_color)
-
-    if qr_customization.logo:
-        logo = Image.open(qr_customization.logo.path)
-        logo_size = (qr_img.size[0] // 4, qr_img.size[1] // 4)
-        logo = logo.resize(logo_size, Image.LANCZOS)
-        pos = ((qr_img.size[0] - logo.size[0]) // 2, (qr_img.size[1] - logo.size[1]) // 2)
-        qr_img.paste(logo, pos, logo)
-
-    # Save QR code image to media storage
-    qr_buffer = io.BytesIO()
-    qr_img.save(qr_buffer, format="PNG")
-    qr_buffer.seek(0)
-    
-    qr_code_path = f'qr_codes/student_{student_id}.png'
-    default_storage.save(qr_code_path, ContentFile(qr_buffer.getvalue()))
-    
-    # Return the full URL for the QR code
-    return f"{settings.BASE_URL}{settings.MEDIA_URL}{qr_code_path}"
-
 def upload_csv(request):
     if request.method == 'POST':
         if 'csv_file' not in request.FILES:
             messages.error(request, 'Please select a CSV file to upload.')
             return redirect('certifications:upload_csv')
 
-        csv_file = request.FILES['csv_file']
-        if not csv_file.name.endswith('.csv'):
-            messages.error(request, 'File must be a CSV.')
-            return redirect('certifications:upload_csv')
-
-        try:
-            # Read the CSV file
-            decoded_file = csv_file.read().decode('utf-8')
-            csv_data = csv.DictReader(io.StringIO(decoded_file))
-            
-            success_count = 0
-            error_count = 0
-            skip_count = 0
-            error_messages = []
-
-            with transaction.atomic():
-                for row in csv_data:
-                    try:
-                        # Check if student with this matricule already exists
-                        matricule = row['matricule']
-                        if Student.objects.filter(matricule=matricule).exists():
-                            skip_count += 1
-                            continue
-
-                        # Get or create issuer
-                        issuer, _ = Issuer.objects.get_or_create(
-                            name_en=row['issuer_name_en']
-                        )
-
-                        # Create student record
-                        student = Student.objects.create(
-                            noms_et_prenoms=row['noms_et_prenoms'],
-                            matricule=matricule,
-                            filiere=row['filiere'],
-                            mention=row['mention'],
-                            session=row.get('session', ''),
-                            sexe=row.get('sexe', ''),
-                            date_de_naissance=row.get('date_de_naissance', None),
-                            lieu_de_naissance=row.get('lieu_de_naissance', ''),
-                            numero=row.get('numero', ''),
-                            issuer=issuer
-                        )
-                        
-                        # Generate QR code for the student
-                        qr_code_url = generate_qr_code(student.id)
-                        student.qr_code_link = qr_code_url
-                        student.save()
-                        
-                        success_count += 1
-                    except Exception as e:
-                        error_count += 1
-                        error_messages.append(f"Error in row {success_count + error_count + skip_count}: {str(e)}")
-                        continue
-
-            if success_count > 0:
-                messages.success(request, f'Successfully imported {success_count} student records.')
-            if skip_count > 0:
-                messages.info(request, f'Skipped {skip_count} duplicate records.')
-            if error_count > 0:
-                messages.warning(request, f'Failed to import {error_count} records. Check the format and try again.')
-                for error in error_messages:
+        form = CSVUploadForm(request.POST, request.FILES)
+        if not form.is_valid():
+            for errors in form.errors.values():
+                for error in errors:
                     messages.error(request, error)
-
-        except Exception as e:
-            messages.error(request, f'Error processing CSV file: {str(e)}')
             return redirect('certifications:upload_csv')
 
-        return redirect('certifications:index')
+        # Queue the file; the process_csv_uploads worker does the import.
+        upload = CSVUpload.objects.create(file=form.cleaned_data['csv_file'], mode=form.cleaned_data['mode'])
+        messages.info(request, 'CSV file uploaded. Import is in progress.')
+        return redirect('certifications:csv_upload_status', upload_id=upload.id)
 
     return render(request, 'upload_csv.html')
 
+def csv_upload_status(request, upload_id):
+    upload = get_object_or_404(CSVUpload, id=upload_id)
+    return render(request, 'csv_upload_status.html', {'upload': upload})
+
+def csv_upload_progress(request, upload_id):
+    upload = get_object_or_404(CSVUpload, id=upload_id)
+    return JsonResponse({
+        'id': upload.id,
+        'status': upload.status,
+        'processed': upload.processed,
+        'progress': upload.progress,
+        'total_records': upload.total_records,
+        'successful_records': upload.successful_records,
+        'updated_records': upload.updated_records,
+        'skipped_records': upload.skipped_records,
+        'failed_records': upload.failed_records,
+        'errors': upload.error_log.splitlines() if upload.error_log else [],
+        'error_report_url': (
+            reverse('certifications:csv_upload_report', args=[upload.id]) if upload.error_report else None
+        ),
+    })
+
+def csv_upload_report(request, upload_id):
+    upload = get_object_or_404(CSVUpload, id=upload_id)
+    if not upload.error_report:
+        raise Http404('No error report for this upload')
+    return FileResponse(
+        upload.error_report.open('rb'), as_attachment=True, content_type='text/csv',
+        filename=f'upload_{upload.id}_errors.csv',
+    )
+
 def verify(request, student_id):
-    student = get_object_or_404(Student, id=student_id)
-    context = {'student': student}
-    return render(request, 'student_verification.html', context)
+    return cached_student_page(request, 'student_verification.html', student_id)
 
 def student_qr_info(request, student_id):
-    student = get_object_or_404(Student, id=student_id)
-    context = {
-        'student': student,
-    }
-    return render(request, 'student_qr_info.html', context)
+    return cached_student_page(request, 'student_qr_info.html', student_id)
+
+def student_qr_image(request, student_id, fmt):
+    if fmt not in QR_FORMATS:
+        raise Http404('Unsupported QR format')
+    # No (or an unreadable) size means the native size; any other is honoured within bounds.
+    try:
+        size = min(max(int(request.GET['size']), QR_MIN_SIZE), QR_MAX_SIZE)
+    except (KeyError, ValueError):
+        size = None
+    get_object_or_404(Student.objects.only('id'), id=student_id)
+
+    # The content address doubles as the ETag, so revalidation needs no rendering.
+    payload = qr_payload(student_id)
+    style_key = qr_style_key(get_qr_customization())
+    etag = quote_etag(os.path.basename(qr_code_path(payload, style_key, fmt, size)))
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(get_qr_image(payload, style_key, fmt, size), content_type=QR_FORMATS[fmt])
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=settings.QR_HTTP_MAX_AGE)
+    return response
+
+@gzip_page
+def api_search_students(request):
+    form = StudentFilterForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    students = form.filter(Student.objects.order_by('-id')).values('id', 'noms_et_prenoms', 'matricule', 'numero', 'issuer__name_en')
+    return JsonResponse({'results': [
+        {
+            'id': student['id'],
+            'noms_et_prenoms': student['noms_et_prenoms'],
+            'matricule': student['matricule'],
+            'numero': student['numero'],
+            'issuer': student['issuer__name_en'],
+        }
+        for student in students[:SEARCH_RESULTS_LIMIT]
+    ]})
+
+@gzip_page
+def api_student(request, student_id):
+    data = get_students_data([student_id]).get(student_id)
+    if data is None:
+        return JsonResponse({'error': 'Student not found.'}, status=404)
+    return conditional_json_response(request, data)
+
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+@gzip_page
+def api_students(request):
+    """Verify many students at once: ``?ids=1,2,3`` or a POSTed ``{"ids": [...]}``."""
+    try:
+        if request.method == 'POST':
+            student_ids = json.loads(request.body)['ids']
+        else:
+            student_ids = request.GET.get('ids', '').split(',')
+        student_ids = list(dict.fromkeys(int(student_id) for student_id in student_ids))
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({'error': 'ids must be a list of student ids.'}, status=400)
+    if len(student_ids) > VERIFICATION_API_MAX_IDS:
+        return JsonResponse({'error': f'At most {VERIFICATION_API_MAX_IDS} ids per request.'}, status=400)
+
+    found = get_students_data(student_ids)
+    return conditional_json_response(request, {
+        'students': [found[student_id] for student_id in student_ids if student_id in found],
+        'missing': [student_id for student_id in student_ids if student_id not in found],
+    })
+
+def certificate_pdf(request, student_id):
+    student = get_object_or_404(Student.objects.select_related('issuer', 'template'), id=student_id)
+    path = get_certificate_pdf(student)
+    return FileResponse(default_storage.open(path, 'rb'), content_type='application/pdf', filename=f'certificat_{student.id}.pdf')
 
 def download_qr_codes(request):
-    students = Student.objects.all()
-    
-    # Create a CSV file with student data and QR code links
-    csv_buffer = io.StringIO()
-    csv_writer = csv.writer(csv_buffer)
-    csv_writer.writerow(['Noms et Prénoms', 'Matricule', 'Filière', 'Mention', 'Session', 'Sexe', 'Date de Naissance', 'Lieu de Naissance', 'Numéro', 'Issuer', 'Issue Date', 'QR Code Link'])
-    
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w') as zip_file:
-        for student in students:
-            # Write student data to CSV
-            csv_writer.writerow([
-                student.noms_et_prenoms,
-                student.matricule,
-                student.filiere,
-                student.mention,
-                student.session,
-                student.sexe,
-                student.date_de_naissance,
-                student.lieu_de_naissance,
-                student.numero,
-                student.issuer.name_en,
-                student.issue_date,
-                student.qr_code_link
-            ])
-            
-            # Add QR code image to zip file if it exists
-            if student.qr_code_link:
-                qr_code_path = f'qr_codes/student_{student.id}.png'
-                if default_storage.exists(qr_code_path):
-                    with default_storage.open(qr_code_path, 'rb') as qr_file:
-                        zip_file.writestr(f'qr_codes/student_{student.id}.png', qr_file.read())
-        
-        # Add CSV file to zip
-        zip_file.writestr('student_data.csv', csv_buffer.getvalue())
-    
-    zip_buffer.seek(0)
-    response = FileResponse(zip_buffer, as_attachment=True, filename='student_qr_codes_and_data.zip')
+    form = ExportFilterForm(request.GET)
+    if not form.is_valid():
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, error)
+        return redirect('certifications:index')
+
+    students = form.filter(Student.objects.order_by('id'))
+    filename = 'student_qr_codes_and_data.zip'
+    # Identical selections are served from the archive built the first time.
+    path = export_cache_path(export_digest(students))
+    if default_storage.exists(path):
+        return cached_export_response(path, filename)
+
+    response = StreamingHttpResponse(cache_export(stream_qr_export(students), path), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
     return response
 
 def manage_templates(request):
@@ -265,6 +273,38 @@ def edit_student(request, student_id):
         form = StudentForm(instance=student)
     return render(request, 'student_form.html', {'form': form, 'action': 'Edit'})
 
+def bulk_students(request):
+    """Delete or reassign every student matching the index filters, after confirmation."""
+    form = BulkStudentActionForm(request.POST if request.method == 'POST' else request.GET)
+    if not form.is_valid():
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, error)
+        return redirect('certifications:index')
+    students = form.filter(Student.objects.all())
+    filter_query = form.data.copy()
+    for key in ('csrfmiddlewaretoken', 'action', 'new_issuer', 'new_template', 'new_session'):
+        filter_query.pop(key, None)
+    index_url = reverse('certifications:index') + (f'?{filter_query.urlencode()}' if filter_query else '')
+
+    if request.method == 'POST':
+        values = form.values()
+        if values is None:
+            count = bulk_delete_students(students)
+            messages.success(request, f'Deleted {count} student record{"s" if count != 1 else ""}.')
+        else:
+            count = bulk_update_students(students, **values)
+            messages.success(request, f'Updated {count} student record{"s" if count != 1 else ""}.')
+        return redirect(index_url)
+
+    return render(request, 'student_bulk_confirm.html', {
+        'form': form,
+        'action': dict(form.ACTION_CHOICES)[form.cleaned_data['action']],
+        'values': form.values(),
+        'student_count': students.count(),
+        'index_url': index_url,
+    })
+
 def create_issuer(request):
     if request.method == 'POST':
         form = IssuerForm(request.POST, request.FILES)
@@ -294,10 +334,13 @@ def list_issuers(request):
 
 def verify_issuer(request, uuid):
     issuer = get_object_or_404(Issuer, uuid=uuid)
-    students = issuer.student_set.all()
+    students = issuer.student_set.only('id', 'issuer_id', 'noms_et_prenoms', 'matricule', 'filiere', 'mention', 'issue_date')
+    paginator = KeysetPaginator(students, 50, field='issue_date')
+    page = paginator.page(after=request.GET.get('after'), before=request.GET.get('before'))
     context = {
         'issuer': issuer,
-        'students': students,
+        'students': page,
+        'student_count': get_issuer_student_count(issuer),
     }
     return render(request, 'verify_issuer.html', context)
 
@@ -305,11 +348,11 @@ def delete_student(request, student_id):
     student = get_object_or_404(Student, id=student_id)
     if request.method == 'POST':
         # Delete the QR code file if it exists
-        if student.qr_code_link:
-            qr_code_path = f'qr_codes/student_{student.id}.png'
-            if default_storage.exists(qr_code_path):
-                default_storage.delete(qr_code_path)
+        qr_code_path = qr_link_path(student.qr_code_link)
+        if qr_code_path and default_storage.exists(qr_code_path):
+            default_storage.delete(qr_code_path)
         student.delete()
+        delete_certificate_pdfs([student_id])
         messages.success(request, f'Student record deleted for {student.noms_et_prenoms}')
         return redirect('certifications:index')
     return render(request, 'student_confirm_delete.html', {'student': student})